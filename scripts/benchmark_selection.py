@@ -0,0 +1,60 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ts.forecast import ALL_MODELS, train_model  # noqa: E402
+from ts.selection import select_model  # noqa: E402
+
+FH = 10
+
+
+def make_series(rng: np.random.Generator) -> dict[str, tuple[np.ndarray, list[int]]]:
+    x = np.arange(1000)
+    return {
+        "seasonal, 300": (
+            10
+            + 0.05 * x[:300]
+            + 3 * np.sin(2 * np.pi * x[:300] / 12)
+            + rng.normal(0, 0.5, 300),
+            [12],
+        ),
+        "weekly, 500": (
+            50 + 5 * np.sin(2 * np.pi * x[:500] / 7) + rng.normal(0, 1, 500),
+            [7],
+        ),
+        "random walk, 1000": (np.cumsum(rng.normal(size=1000)), []),
+    }
+
+
+def sweep(series: np.ndarray, season_lengths: list[int]):
+    # the alternative to "Auto": fit every model once on the whole series
+    for model_name in ALL_MODELS:
+        train_model(model_name, series, season_lengths)
+
+
+def auto(series: np.ndarray, season_lengths: list[int]) -> str:
+    model_name = select_model(series, FH, season_lengths=season_lengths)
+    train_model(model_name, series, season_lengths)
+    return model_name
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    all_series = make_series(rng)
+    sweep(*all_series["seasonal, 300"])  # jit compilation
+
+    print(f"{'series':>18} {'sweep, s':>9} {'auto, s':>8} {'selected':>28}")
+    for name, (series, season_lengths) in all_series.items():
+        sweep_time, _ = timed(sweep, series, season_lengths)
+        auto_time, selected = timed(auto, series, season_lengths)
+        print(f"{name:>18} {sweep_time:>9.2f} {auto_time:>8.2f} {selected:>28}")
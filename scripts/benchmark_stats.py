@@ -0,0 +1,63 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+
+from ts.analyze import get_simple_stats  # noqa: E402
+
+SIZES = [5_000, 1_000_000, 10_000_000]
+REPEATS = 3
+
+
+def get_simple_stats_pandas(series: pd.Series) -> dict:
+    # previous implementation: describe plus two value_counts passes
+    desc = series.describe(percentiles=[0.25, 0.75])
+    return {
+        "mean": desc["mean"],
+        "median": desc["50%"],
+        "std": desc["std"],
+        "q25": desc["25%"],
+        "q75": desc["75%"],
+        "min": desc["min"],
+        "max": desc["max"],
+        "most_frequent": series.value_counts().nlargest(3).to_dict(),
+        "least_frequent": series.value_counts().nsmallest(3).to_dict(),
+    }
+
+
+def best_time(func, series: pd.Series) -> float:
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(series)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    get_simple_stats(pd.Series(rng.normal(size=100)))  # jit compilation
+
+    print(f"{'points':>12} {'pandas, s':>10} {'kernel, s':>10} {'speedup':>8}")
+    for size in SIZES:
+        # rounded values, so the frequency statistics have repeats to count
+        series = pd.Series(np.round(rng.normal(100, 10, size), 2))
+
+        expected = get_simple_stats_pandas(series)
+        actual = get_simple_stats(series)
+        for key in ["mean", "median", "std", "q25", "q75", "min", "max"]:
+            assert np.isclose(expected[key], actual[key]), key
+        assert sorted(expected["most_frequent"].values()) == sorted(
+            actual["most_frequent"].values()
+        )
+
+        pandas_time = best_time(get_simple_stats_pandas, series)
+        kernel_time = best_time(get_simple_stats, series)
+        print(
+            f"{size:>12,} {pandas_time:>10.4f} {kernel_time:>10.4f} "
+            f"{pandas_time / kernel_time:>7.1f}x"
+        )
@@ -1,11 +1,13 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Annotated
+from uuid import uuid4
 
 import jwt
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
 from redis import Redis
@@ -14,8 +16,12 @@ from rq.job import Job
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from contracts import (
+    AnalysisBatchRequest,
+    ForecastBatchItem,
+    ForecastModelsRequest,
     ModelResponse,
     TaskResponse,
+    TimeSeriesAppend,
     TimeSeriesCreate,
     TimeSeriesResponse,
     Token,
@@ -25,25 +31,41 @@ from contracts import (
 from db import (
     AsyncSessionLocal,
     add_forecast_ts_id,
+    append_time_series,
+    apply_analysis_batch,
     create_forecast,
     create_task,
     create_time_series,
     create_user,
     delete_time_series,
+    find_cached_forecast,
     get_all_models,
     get_db,
     get_forecast_by_id,
+    get_latest_task_result,
+    get_model_tariffs,
+    get_pyramid_slice,
     get_task_by_task_id,
     get_tasks_for_user,
     get_time_series_by_id,
+    get_time_series_ids,
+    get_time_series_length,
     get_user_by_login,
     init_db,
     populate_models,
     update_analysis_results,
     update_task_by_task_id,
+    update_task_result,
     update_user_balance,
     withdraw_user_balance,
 )
+from inflight import (
+    attach_to_job,
+    inflight_key,
+    peek_waiting_tasks,
+    pop_waiting_tasks,
+    register_job,
+)
 from security import (
     ALGORITHM,
     SECRET_KEY,
@@ -51,7 +73,31 @@ from security import (
     create_access_token,
     get_password_hash,
 )
-from tasks import task_analyze_time_series, task_forecast_time_series
+from tasks import (
+    task_analyze_batch,
+    task_analyze_series_file,
+    task_analyze_time_series,
+    task_backtest_time_series,
+    task_forecast_batch,
+    task_forecast_time_series,
+    task_forecast_time_series_models,
+)
+from ts.analyze import (
+    ANALYSIS_ARRAYS,
+    ANALYSIS_SECTIONS,
+    analyze_time_series,
+    rebuild_analysis_arrays,
+    split_sections,
+)
+from ts.chunked import CHUNKED_SECTIONS, remove_series_files, save_series
+from ts.forecast import (
+    ALL_MODELS,
+    FAST_MODELS,
+    forecast,
+    get_season_lengths,
+    train_model,
+)
+from ts.pyramid import VIEW_MAX_POINTS, decode_view, view_window
 
 load_dotenv()
 
@@ -60,12 +106,26 @@ redis_conn = Redis(
 )
 queue = Queue("default", connection=redis_conn)
 
+# seconds of compute per forecast job, must stay below its job_timeout
+FORECAST_TIME_BUDGET = int(os.getenv("FORECAST_TIME_BUDGET", 8 * 60))
+
+# seconds of analysis computed inside the request, the rest is queued
+INLINE_ANALYSIS_BUDGET = float(os.getenv("INLINE_ANALYSIS_BUDGET", 0.05))
+# longer series are analyzed by chunks from a file in bounded memory
+CHUNKED_ANALYSIS_MIN_LENGTH = int(os.getenv("CHUNKED_ANALYSIS_MIN_LENGTH", 5_000_000))
+
+FORECAST_CACHE_HITS_KEY = "forecast_cache:hits"
+FORECAST_CACHE_MISSES_KEY = "forecast_cache:misses"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
     async with AsyncSessionLocal() as session:
         await populate_models(session, Path("data/models_info.json"))
+    # compiles (or loads from the Numba cache) kernels of the inline models
+    for model_name in FAST_MODELS:
+        forecast(train_model(model_name, [1.0, 2.0, 3.0, 4.0], [2]), 2)
     yield
 
 
@@ -100,7 +160,7 @@ async def get_current_user(
         login=user.login,
         name=user.name,
         balance=user.balance,
-        time_series=[ts.id for ts in user.time_series],
+        time_series=await get_time_series_ids(db, user.id),
     )
 
 
@@ -173,7 +233,7 @@ async def top_up_balance(
         login=updated_user.login,
         name=updated_user.name,
         balance=updated_user.balance,
-        time_series=[ts.id for ts in updated_user.time_series],
+        time_series=await get_time_series_ids(db, updated_user.id),
     )
 
 
@@ -208,13 +268,112 @@ async def get_time_series_endpoint(
     ts_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[UserResponse, Depends(get_current_user)],
+    include_data: bool = True,
 ):
-    db_ts = await get_time_series_by_id(db, ts_id)
+    db_ts = await get_time_series_by_id(db, ts_id, with_data=include_data)
 
     if not db_ts:
         raise HTTPException(status_code=404, detail="Time series not found")
     assert db_ts.user_id == current_user.id, "User ID does not match"
 
+    return TimeSeriesResponse(
+        id=db_ts.id,
+        user_id=db_ts.user_id,
+        name=db_ts.name,
+        created_at=db_ts.created_at,
+        length=db_ts.length,
+        data=db_ts.data if include_data else [],
+        analysis_results=db_ts.analysis_results,
+        forecasting_ts=db_ts.forecasting_ts,
+    )
+
+
+@app.get("/time_series/{ts_id}/analysis_arrays")
+async def get_analysis_arrays_endpoint(
+    ts_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+    arrays: Annotated[list[str] | None, Query()] = None,
+    start: Annotated[int, Query(ge=0)] = 0,
+    end: int | None = None,
+    step: Annotated[int, Query(ge=1)] = 1,
+):
+    if ts_id not in current_user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to access this time series",
+        )
+
+    arrays = arrays or ANALYSIS_ARRAYS
+    unknown = [name for name in arrays if name not in ANALYSIS_ARRAYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown arrays: {unknown}")
+
+    db_ts = await get_time_series_by_id(db, ts_id)
+    if not db_ts:
+        raise HTTPException(status_code=404, detail="Time series not found")
+
+    return await asyncio.get_running_loop().run_in_executor(
+        None,
+        rebuild_analysis_arrays,
+        db_ts.data,
+        db_ts.analysis_results or {},
+        db_ts.smoothed_series,
+        arrays,
+        start,
+        end,
+        step,
+    )
+
+
+@app.get("/time_series/{ts_id}/view")
+async def get_time_series_view_endpoint(
+    ts_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+    start: Annotated[int, Query(ge=0)] = 0,
+    end: int | None = None,
+    max_points: Annotated[int, Query(ge=1, le=100_000)] = VIEW_MAX_POINTS,
+):
+    if ts_id not in current_user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to access this time series",
+        )
+
+    length = await get_time_series_length(db, ts_id)
+    if length is None:
+        raise HTTPException(status_code=404, detail="Time series not found")
+    end = length if end is None else min(end, length)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Empty range")
+
+    bucket_size, first, count = view_window(start, end, max_points, length)
+    columns = await get_pyramid_slice(db, ts_id, bucket_size, first, count)
+    if columns is None:
+        raise HTTPException(status_code=404, detail="Time series view not found")
+    return decode_view(columns, bucket_size, first)
+
+
+@app.post("/time_series/{ts_id}/append", response_model=TimeSeriesResponse)
+async def append_time_series_endpoint(
+    ts_id: int,
+    ts_append: TimeSeriesAppend,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    if not ts_append.data:
+        raise HTTPException(status_code=400, detail="Data cannot be empty")
+    if ts_id not in current_user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to modify this time series",
+        )
+
+    db_ts = await append_time_series(db, ts_id, ts_append.data)
+    # files of queued chunked analyses hold the series before the append
+    remove_series_files(f"{ts_id}-")
+
     return TimeSeriesResponse(
         id=db_ts.id,
         user_id=db_ts.user_id,
@@ -241,6 +400,7 @@ async def delete_time_series_endpoint(
             status_code=404,
             detail="Time series not found or you don't have permission to delete it",
         )
+    remove_series_files(f"{ts_id}-")
 
     return {"message": "Time series deleted successfully"}
 
@@ -258,11 +418,36 @@ async def get_all_models_endpoint(
     ]
 
 
+def enqueue_or_attach(
+    key: str, task_id: int, meta: dict, func, *args, **kwargs
+) -> Job | None:
+    """
+    Single-flight enqueue: if an identical job is already queued or running,
+    the task is attached to it and None is returned. The job meta is saved
+    with the job, so a job finishing right away is processed with it.
+    """
+    if attach_to_job(redis_conn, key, task_id):
+        return None
+
+    job_id = str(uuid4())
+    registered = register_job(redis_conn, key, job_id)
+    if registered:
+        meta = {**meta, "inflight_key": key}
+    try:
+        return queue.enqueue(func, *args, job_id=job_id, meta=meta, **kwargs)
+    except Exception:
+        if registered:
+            # the job does not exist, identical tasks must not attach to it
+            pop_waiting_tasks(redis_conn, key, job_id)
+        raise
+
+
 @app.post("/analyze_time_series")
 async def analyze_time_series_endpoint(
     ts_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserResponse, Depends(get_current_user)],
+    sections: Annotated[list[str] | None, Query()] = None,
 ):
     if ts_id not in user.time_series:
         raise HTTPException(
@@ -270,26 +455,136 @@ async def analyze_time_series_endpoint(
             detail="You don't have permission to analyze this time series",
         )
 
+    requested_sections = sections or []
+    sections = sections or list(ANALYSIS_SECTIONS)
+    unknown = [section for section in sections if section not in ANALYSIS_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown analysis sections: {unknown}"
+        )
+
     ts = await get_time_series_by_id(db, ts_id)
     ts_data = [d for d in ts.data]  # to avoid lazy loading issues
 
     if not ts:
         raise HTTPException(status_code=404, detail="Time series not found")
 
+    loop = asyncio.get_running_loop()
+    chunked = ts.length >= CHUNKED_ANALYSIS_MIN_LENGTH
+    if chunked:
+        # long series are streamed by the worker from a memory-mapped file
+        # instead of a list pickled through Redis (tests need the whole series)
+        unsupported = [s for s in requested_sections if s not in CHUNKED_SECTIONS]
+        if unsupported:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sections {unsupported} are not computed for series "
+                f"longer than {CHUNKED_ANALYSIS_MIN_LENGTH} points",
+            )
+        inline_sections = []
+        queued_sections = [s for s in CHUNKED_SECTIONS if s in sections]
+    else:
+        # cheap sections are computed right away, off the event loop
+        inline_sections, queued_sections = split_sections(
+            sections, ts.length, INLINE_ANALYSIS_BUDGET
+        )
+    if inline_sections:
+        results = await loop.run_in_executor(
+            None, analyze_time_series, ts_data, inline_sections
+        )
+        await update_analysis_results(db, ts_id, results)
+
+    if not queued_sections:
+        await create_task(db, ts_id, user.id, 0, "analyze", "", "done")
+        return {
+            "message": "Analysis completed inline",
+            "inline_sections": inline_sections,
+            "queued_sections": [],
+        }
+
     task = await create_task(db, ts_id, user.id, 0, "analyze", "", "queued")
 
-    job = queue.enqueue(
-        task_analyze_time_series,
-        ts_data,
+    if chunked:
+        path = await loop.run_in_executor(
+            None, save_series, ts_data, f"{ts_id}-{task.id}"
+        )
+        job_args = (task_analyze_series_file, str(path), task.id, queued_sections)
+    else:
+        job_args = (task_analyze_time_series, ts_data, task.id, queued_sections)
+    job = enqueue_or_attach(
+        inflight_key(ts.data_hash, "analyze", ",".join(queued_sections)),
         task.id,
-        job_timeout="10m",
+        {"task_id": task.id, "cost": 0},
+        *job_args,
+        job_timeout="1h" if chunked else "10m",
     )
+    if job is None:
+        if chunked:
+            path.unlink(missing_ok=True)
+        return {
+            "message": "Task attached to identical in-flight job",
+            "inline_sections": inline_sections,
+            "queued_sections": queued_sections,
+        }
 
-    job.meta["task_id"] = task.id
-    job.meta["cost"] = 0
-    job.save_meta()
+    return {
+        "message": "Task enqueued successfully",
+        "inline_sections": inline_sections,
+        "queued_sections": queued_sections,
+    }
 
-    return {"message": "Task enqueued successfully"}
+
+@app.post("/analyze_time_series_batch")
+async def analyze_time_series_batch_endpoint(
+    request: AnalysisBatchRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    if not request.ts_ids:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+
+    sections = request.sections or list(ANALYSIS_SECTIONS)
+    unknown = [section for section in sections if section not in ANALYSIS_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown analysis sections: {unknown}"
+        )
+
+    series = {}
+    for ts_id in request.ts_ids:
+        if ts_id not in user.time_series:
+            raise HTTPException(
+                status_code=403,
+                detail="You don't have permission to analyze this time series",
+            )
+        ts = await get_time_series_by_id(db, ts_id)
+        if not ts:
+            raise HTTPException(status_code=404, detail="Time series not found")
+        if ts.length >= CHUNKED_ANALYSIS_MIN_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Time series {ts_id} is too long for batch analysis",
+            )
+        series[ts_id] = [d for d in ts.data]  # to avoid lazy loading issues
+
+    job_items = []
+    for ts_id, ts_data in series.items():
+        task = await create_task(db, ts_id, user.id, 0, "analyze", "", "queued")
+        job_items.append({"task_id": task.id, "ts_data": ts_data})
+
+    queue.enqueue(
+        task_analyze_batch,
+        job_items,
+        sections,
+        job_timeout="60m",
+        meta={
+            "task_ids": [item["task_id"] for item in job_items],
+            "user_id": user.id,
+            "cost": 0,
+        },
+    )
+
+    return {"message": f"Batch of {len(job_items)} tasks enqueued successfully"}
 
 
 @app.post("/forecast_time_series")
@@ -300,6 +595,8 @@ async def forecast_time_series_endpoint(
     cost: float,
     db: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserResponse, Depends(get_current_user)],
+    time_budget: Annotated[int | None, Query(gt=0)] = None,
+    parallel: bool = False,
 ):
     if ts_id not in user.time_series:
         raise HTTPException(
@@ -317,27 +614,327 @@ async def forecast_time_series_endpoint(
     if res is None:
         raise HTTPException(status_code=403, detail="Not enough balance")
 
+    season_lengths = get_season_lengths(ts.analysis_results, ts.length)
+
+    # errors of the latest backtest calibrate the intervals without extra fits,
+    # if it was run on this version of the series with the same seasons
+    calibration_errors = None
+    backtest_task = await get_latest_task_result(db, ts_id, "backtest")
+    if (
+        backtest_task
+        and backtest_task.result["h"] >= fh
+        and backtest_task.result.get("data_hash") == ts.data_hash
+        and backtest_task.result.get("season_lengths") == season_lengths
+    ):
+        calibration_errors = {
+            model_name: [window["errors"] for window in model_results["windows"]]
+            for model_name, model_results in backtest_task.result["models"].items()
+        }
+
+    if model in FAST_MODELS:
+        # cheap kernels are computed right away, off the event loop, instead
+        # of taking a queue slot; failures are refunded as for queued jobs
+        task = await create_task(
+            db, ts_id, user.id, cost, "forecast", f"{model}__{fh}", "in_progress"
+        )
+        result = await asyncio.get_running_loop().run_in_executor(
+            None,
+            task_forecast_time_series,
+            ts_data,
+            task.id,
+            model,
+            fh,
+            season_lengths,
+            None,
+            False,
+            ts.lineage,
+            calibration_errors,
+            False,
+        )
+        await apply_task_result(db, result)
+        if not result["success"]:
+            raise HTTPException(
+                status_code=500, detail=f"Forecast failed: {result['error']}"
+            )
+        return {"message": "Forecast computed inline", "inline": True}
+
+    cached = await find_cached_forecast(db, ts.data_hash, model, fh, season_lengths)
+    if cached:
+        redis_conn.incr(FORECAST_CACHE_HITS_KEY)
+        await create_task(
+            db, ts_id, user.id, cost, "forecast", f"{model}__{fh}", "done"
+        )
+        forecast_ts = await create_forecast(
+            db,
+            model,
+            fh,
+            cached.data[:fh],
+            ts.data_hash,
+            cached.model_used,
+            cached.lower[:fh] if cached.lower else None,
+            cached.upper[:fh] if cached.upper else None,
+            cached.level,
+            season_lengths,
+        )
+        await add_forecast_ts_id(db, ts_id, forecast_ts.id)
+        return {"message": "Forecast served from cache", "cache": "hit"}
+    redis_conn.incr(FORECAST_CACHE_MISSES_KEY)
+
     task = await create_task(
         db, ts_id, user.id, cost, "forecast", f"{model}__{fh}", "queued"
     )
 
-    job = queue.enqueue(
+    job = enqueue_or_attach(
+        inflight_key(ts.data_hash, "forecast", model, fh),
+        task.id,
+        {"task_id": task.id, "user_id": user.id, "cost": cost},
         task_forecast_time_series,
         ts_data,
         task.id,
         model,
         fh,
+        season_lengths,
+        min(time_budget or FORECAST_TIME_BUDGET, FORECAST_TIME_BUDGET),
+        parallel,
+        ts.lineage,
+        calibration_errors,
         job_timeout="10m",
     )
+    if job is None:
+        return {"message": "Task attached to identical in-flight job", "cache": "miss"}
+
+    return {"message": "Task enqueued successfully", "cache": "miss"}
 
-    job.meta["task_id"] = task.id
-    job.meta["user_id"] = user.id
-    job.meta["cost"] = cost
-    job.save_meta()
+
+@app.get("/forecast_cache_stats")
+async def get_forecast_cache_stats(
+    _: Annotated[UserResponse, Depends(get_current_user)],
+):
+    hits = int(redis_conn.get(FORECAST_CACHE_HITS_KEY) or 0)
+    misses = int(redis_conn.get(FORECAST_CACHE_MISSES_KEY) or 0)
+    total = hits + misses
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+@app.post("/forecast_time_series_batch")
+async def forecast_time_series_batch_endpoint(
+    items: list[ForecastBatchItem],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    unknown_models = list(
+        dict.fromkeys(item.model for item in items if item.model not in ALL_MODELS)
+    )
+    if unknown_models:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown models: {', '.join(unknown_models)}"
+        )
+    if min(item.fh for item in items) <= 0:
+        raise HTTPException(status_code=400, detail="Horizons must be positive")
+
+    series = {}
+    for item in items:
+        if item.ts_id not in user.time_series:
+            raise HTTPException(
+                status_code=403,
+                detail="You don't have permission to forecast this time series",
+            )
+        if item.ts_id not in series:
+            ts = await get_time_series_by_id(db, item.ts_id)
+            if not ts:
+                raise HTTPException(status_code=404, detail="Time series not found")
+            series[item.ts_id] = (
+                [d for d in ts.data],  # to avoid lazy loading issues
+                get_season_lengths(ts.analysis_results, ts.length),
+            )
+
+    total_cost = sum(item.cost for item in items)
+    res = await withdraw_user_balance(db, user.id, total_cost)
+    if res is None:
+        raise HTTPException(status_code=403, detail="Not enough balance")
+
+    job_items = []
+    for item in items:
+        task = await create_task(
+            db,
+            item.ts_id,
+            user.id,
+            item.cost,
+            "forecast",
+            f"{item.model}__{item.fh}",
+            "queued",
+        )
+        job_items.append(
+            {
+                "task_id": task.id,
+                "ts_data": series[item.ts_id][0],
+                "model": item.model,
+                "fh": item.fh,
+                "season_lengths": series[item.ts_id][1],
+            }
+        )
+
+    queue.enqueue(
+        task_forecast_batch,
+        job_items,
+        job_timeout="60m",
+        meta={
+            "task_ids": [item["task_id"] for item in job_items],
+            "user_id": user.id,
+            "cost": total_cost,
+        },
+    )
+
+    return {"message": f"Batch of {len(job_items)} tasks enqueued successfully"}
+
+
+@app.post("/forecast_time_series_models")
+async def forecast_time_series_models_endpoint(
+    request: ForecastModelsRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    if request.ts_id not in user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to forecast this time series",
+        )
+
+    models = list(dict.fromkeys(request.models))
+    fhs = list(dict.fromkeys(request.fhs))
+    if not models or not fhs:
+        raise HTTPException(
+            status_code=400, detail="At least one model and horizon are required"
+        )
+    if min(fhs) <= 0:
+        raise HTTPException(status_code=400, detail="Horizons must be positive")
+
+    tariffs = await get_model_tariffs(db)
+    unknown_models = [model for model in models if model not in tariffs]
+    if unknown_models:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown models: {', '.join(unknown_models)}"
+        )
+
+    ts = await get_time_series_by_id(db, request.ts_id)
+    if not ts:
+        raise HTTPException(status_code=404, detail="Time series not found")
+    ts_data = [d for d in ts.data]  # to avoid lazy loading issues
+
+    # each model is fitted once and forecast to the longest horizon, so it is
+    # billed once for max(fhs); the price is split between its (model, fh)
+    # forecasts in proportion to fh, as they fail and are refunded together
+    costs = {
+        (model, fh): tariffs[model] * max(fhs) * fh / sum(fhs)
+        for model in models
+        for fh in fhs
+    }
+    total_cost = sum(costs.values())
+    res = await withdraw_user_balance(db, user.id, total_cost)
+    if res is None:
+        raise HTTPException(status_code=403, detail="Not enough balance")
+
+    job_tasks = []
+    for (model, fh), cost in costs.items():
+        task = await create_task(
+            db, request.ts_id, user.id, cost, "forecast", f"{model}__{fh}", "queued"
+        )
+        job_tasks.append({"task_id": task.id, "model": model, "fh": fh})
+
+    queue.enqueue(
+        task_forecast_time_series_models,
+        ts_data,
+        job_tasks,
+        get_season_lengths(ts.analysis_results, ts.length),
+        job_timeout="30m",
+        meta={
+            "task_ids": [task["task_id"] for task in job_tasks],
+            "user_id": user.id,
+            "cost": total_cost,
+        },
+    )
+
+    return {
+        "message": f"{len(job_tasks)} forecasts enqueued successfully",
+        "cost": total_cost,
+    }
+
+
+@app.post("/backtest_time_series")
+async def backtest_time_series_endpoint(
+    ts_id: int,
+    models: Annotated[list[str], Query()],
+    h: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserResponse, Depends(get_current_user)],
+    n_windows: int = 5,
+):
+    if ts_id not in user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to backtest this time series",
+        )
+
+    unknown_models = [model for model in models if model not in ALL_MODELS]
+    if unknown_models:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown models: {', '.join(unknown_models)}"
+        )
+    if h <= 0 or n_windows <= 0:
+        raise HTTPException(
+            status_code=400, detail="Horizon and number of windows must be positive"
+        )
+
+    ts = await get_time_series_by_id(db, ts_id)
+    if not ts:
+        raise HTTPException(status_code=404, detail="Time series not found")
+    ts_data = [d for d in ts.data]  # to avoid lazy loading issues
+
+    task = await create_task(
+        db, ts_id, user.id, 0, "backtest", f"{','.join(models)}__{h}", "queued"
+    )
+
+    job = queue.enqueue(
+        task_backtest_time_series,
+        ts_data,
+        task.id,
+        models,
+        h,
+        n_windows,
+        get_season_lengths(ts.analysis_results, ts.length),
+        ts.data_hash,
+        job_timeout="30m",
+    )
 
     return {"message": "Task enqueued successfully"}
 
 
+@app.get("/backtest_results/{ts_id}")
+async def get_backtest_results_endpoint(
+    ts_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserResponse, Depends(get_current_user)],
+):
+    if ts_id not in user.time_series:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have permission to access this time series",
+        )
+
+    task = await get_latest_task_result(db, ts_id, "backtest")
+    if not task:
+        raise HTTPException(status_code=404, detail="Backtest results not found")
+
+    return {"updated_at": task.updated_at, "params": task.params, **task.result}
+
+
 @app.get("/tasks", response_model=list[TaskResponse])
 async def get_tasks_endpoint(
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -471,11 +1068,73 @@ async def get_forecast_data_endpoint(
         "id": forecast.id,
         "model": forecast.model,
         "fh": forecast.fh,
+        "model_used": forecast.model_used,
         "data": forecast.data,
+        "lower": forecast.lower,
+        "upper": forecast.upper,
+        "level": forecast.level,
         "created_at": forecast.created_at,
     }
 
 
+def get_job_task_ids(job: Job) -> list[int]:
+    if not job.meta:
+        return []
+    if "task_ids" in job.meta:
+        return list(job.meta["task_ids"])
+    if "task_id" in job.meta:
+        return [job.meta["task_id"]]
+    return []
+
+
+def pop_job_waiting_task_ids(job: Job) -> list[int]:
+    if not job.meta or "inflight_key" not in job.meta:
+        return []
+    return pop_waiting_tasks(redis_conn, job.meta["inflight_key"], job.id)
+
+
+async def fail_task(db: AsyncSession, task_id: int):
+    """
+    Marks task as failed and refunds its cost to the owner.
+    """
+    await update_task_by_task_id(db, task_id, "failed")
+    task = await get_task_by_task_id(db, task_id)
+    if task and task.cost > 0:
+        await update_user_balance(db, task.user_id, task.cost)
+
+
+async def apply_task_result(db: AsyncSession, result: dict):
+    task_id = result["task_id"]
+    if not result.get("success"):
+        await fail_task(db, task_id)
+        return
+
+    await update_task_by_task_id(db, task_id, "done")
+
+    task = await get_task_by_task_id(db, task_id)
+    if task and "results" in result:
+        if task.type == "analyze":
+            await update_analysis_results(db, task.ts_id, result["results"])
+        elif task.type == "forecast":
+            ts = await get_time_series_by_id(db, task.ts_id)
+            forecast_ts = await create_forecast(
+                db,
+                result["model"],
+                result["fh"],
+                result["results"],
+                # a budget fallback is not what the model would have forecast
+                ts.data_hash if ts and not result.get("fallback") else None,
+                result.get("model_used"),
+                result.get("lower"),
+                result.get("upper"),
+                result.get("level"),
+                result.get("season_lengths"),
+            )
+            await add_forecast_ts_id(db, task.ts_id, forecast_ts.id)
+        elif task.type == "backtest":
+            await update_task_result(db, task_id, result["results"])
+
+
 @app.post("/process_job_results")
 async def process_job_results_endpoint(
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -491,8 +1150,10 @@ async def process_job_results_endpoint(
         for job_id in started_jobs:
             try:
                 job = Job.fetch(job_id, connection=redis_conn)
-                if job.meta and "task_id" in job.meta:
-                    task_id = job.meta["task_id"]
+                task_ids = get_job_task_ids(job) + peek_waiting_tasks(
+                    redis_conn, job.id
+                )
+                for task_id in task_ids:
                     await update_task_by_task_id(db, task_id, "in_progress")
                     processed_count += 1
             except Exception as e:
@@ -503,40 +1164,37 @@ async def process_job_results_endpoint(
         for job_id in finished_jobs:
             try:
                 job = Job.fetch(job_id, connection=redis_conn)
+                waiting_task_ids = pop_job_waiting_task_ids(job)
 
                 if job.is_finished and job.result:
                     result = job.result
 
-                    if isinstance(result, dict) and "task_id" in result:
-                        task_id = result["task_id"]
-
-                        if result.get("success"):
-                            await update_task_by_task_id(db, task_id, "done")
-
-                            task = await get_task_by_task_id(db, task_id)
-                            if task and "results" in result:
-                                if task.type == "analyze":
-                                    await update_analysis_results(
-                                        db, task.ts_id, result["results"]
-                                    )
-                                elif task.type == "forecast":
-                                    forecast_ts = await create_forecast(
-                                        db,
-                                        result["model"],
-                                        result["fh"],
-                                        result["results"],
-                                    )
-                                    await add_forecast_ts_id(
-                                        db, task.ts_id, forecast_ts.id
-                                    )
-                            processed_count += 1
-                        else:
-                            await update_task_by_task_id(db, task_id, "failed")
+                    if (
+                        isinstance(result, dict)
+                        and result.get("type") == "analyze_batch"
+                    ):
+                        await apply_analysis_batch(db, result["tasks"])
+                        processed_count += len(result["tasks"])
+                    elif isinstance(result, dict):
+                        # batch jobs return a result per task under "tasks"
+                        for task_result in result.get("tasks", [result]):
+                            if "task_id" in task_result:
+                                await apply_task_result(db, task_result)
+                                processed_count += 1
+
+                        # identical tasks attached to this job share its result
+                        for task_id in waiting_task_ids:
+                            await apply_task_result(db, {**result, "task_id": task_id})
                             processed_count += 1
-                            if job.meta["cost"] > 0:
-                                await update_user_balance(
-                                    db, job.meta["user_id"], job.meta["cost"]
-                                )
+
+                        # the smoothed series file is moved into the series blobs
+                        results = result.get("results")
+                        if isinstance(results, dict) and results.get(
+                            "smoothed_series_path"
+                        ):
+                            Path(results["smoothed_series_path"]).unlink(
+                                missing_ok=True
+                            )
 
                 queue.finished_job_registry.remove(job_id)
 
@@ -549,22 +1207,10 @@ async def process_job_results_endpoint(
             try:
                 job = Job.fetch(job_id, connection=redis_conn)
 
-                task_id = None
-                if (
-                    job.result
-                    and isinstance(job.result, dict)
-                    and "task_id" in job.result
-                ):
-                    task_id = job.result["task_id"]
-                elif job.meta and "task_id" in job.meta:
-                    task_id = job.meta["task_id"]
-
-                if task_id:
-                    await update_task_by_task_id(db, task_id, "failed")
+                for task_id in get_job_task_ids(job) + pop_job_waiting_task_ids(job):
+                    await fail_task(db, task_id)
                     processed_count += 1
 
-                if job.meta["cost"] > 0:
-                    await update_user_balance(db, job.meta["user_id"], job.meta["cost"])
                 queue.failed_job_registry.remove(job_id)
 
             except Exception as e:
@@ -576,13 +1222,10 @@ async def process_job_results_endpoint(
             try:
                 job = Job.fetch(job_id, connection=redis_conn)
 
-                if job.meta and "task_id" in job.meta:
-                    task_id = job.meta["task_id"]
-                    await update_task_by_task_id(db, task_id, "failed")
+                for task_id in get_job_task_ids(job) + pop_job_waiting_task_ids(job):
+                    await fail_task(db, task_id)
                     processed_count += 1
 
-                if job.meta["cost"] > 0:
-                    await update_user_balance(db, job.meta["user_id"], job.meta["cost"])
                 queue.deferred_job_registry.remove(job_id)
 
             except Exception as e:
@@ -594,13 +1237,10 @@ async def process_job_results_endpoint(
             try:
                 job = Job.fetch(job_id, connection=redis_conn)
 
-                if job.meta and "task_id" in job.meta:
-                    task_id = job.meta["task_id"]
-                    await update_task_by_task_id(db, task_id, "failed")
+                for task_id in get_job_task_ids(job) + pop_job_waiting_task_ids(job):
+                    await fail_task(db, task_id)
                     processed_count += 1
 
-                if job.meta["cost"] > 0:
-                    await update_user_balance(db, job.meta["user_id"], job.meta["cost"])
                 queue.canceled_job_registry.remove(job_id)
 
             except Exception as e:
@@ -26,6 +26,10 @@ class TimeSeriesCreate(BaseModel):
     data: list[float]
 
 
+class TimeSeriesAppend(BaseModel):
+    data: list[float]
+
+
 class TimeSeriesResponse(BaseModel):
     id: int
     user_id: int
@@ -43,6 +47,24 @@ class ModelResponse(BaseModel):
     tariffs: float
 
 
+class ForecastBatchItem(BaseModel):
+    ts_id: int
+    model: str
+    fh: int
+    cost: float
+
+
+class AnalysisBatchRequest(BaseModel):
+    ts_ids: list[int]
+    sections: list[str] | None = None
+
+
+class ForecastModelsRequest(BaseModel):
+    ts_id: int
+    models: list[str]
+    fhs: list[int]
+
+
 class TaskResponse(BaseModel):
     user_id: int
     ts_id: int
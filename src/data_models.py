@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Float, ForeignKey, Integer, String
+from sqlalchemy import JSON, Float, ForeignKey, Integer, LargeBinary, String
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -32,18 +32,48 @@ class TimeSeries(Base):
     created_at: Mapped[str]
     length: Mapped[int]
     data: Mapped[list[float]] = mapped_column(JSON)
+    data_hash: Mapped[str] = mapped_column(String, index=True)
+    # (length, data_hash) of previous versions, the series only grows by appends
+    lineage: Mapped[list[list]] = mapped_column(JSON, default=list)
     analysis_results: Mapped[dict] = mapped_column(JSON)
+    # mergeable accumulators of ts.online, built on the first append
+    analysis_state: Mapped[dict | None] = mapped_column(JSON)
+    # EWM smoothed series as float32 bytes, kept out of analysis_results
+    smoothed_series: Mapped[bytes | None] = mapped_column(LargeBinary)
     forecasting_ts: Mapped[list[int]] = mapped_column(JSON)
 
     user = relationship("User", back_populates="time_series")
 
 
+class PyramidLevel(Base):
+    __tablename__ = "pyramid_levels"
+
+    ts_id: Mapped[int] = mapped_column(ForeignKey("ts.id"), index=True)
+    bucket_size: Mapped[int]
+    # per-bucket columns of ts.pyramid as fixed width bytes, read by slices
+    lttb_index: Mapped[bytes | None] = mapped_column(LargeBinary)
+    lttb_values: Mapped[bytes] = mapped_column(LargeBinary)
+    min_values: Mapped[bytes | None] = mapped_column(LargeBinary)
+    max_values: Mapped[bytes | None] = mapped_column(LargeBinary)
+    mean_values: Mapped[bytes | None] = mapped_column(LargeBinary)
+
+
 class Forecast(Base):
     __tablename__ = "forecasts"
 
     model: Mapped[str]
     fh: Mapped[int]
     data: Mapped[list[float]] = mapped_column(JSON)
+    # cache key: content hash of the series (unset for budget fallbacks)
+    # and the season lengths the model was fitted with
+    series_hash: Mapped[str | None] = mapped_column(String, index=True)
+    season_key: Mapped[str | None]
+    model_used: Mapped[str | None]  # differs from model after a fallback
+    # prediction interval and its conformal coverage level (unset for the
+    # approximate intervals from in-sample residuals)
+    lower: Mapped[list[float] | None] = mapped_column(JSON)
+    upper: Mapped[list[float] | None] = mapped_column(JSON)
+    level: Mapped[float | None]
     created_at: Mapped[str]
 
 
@@ -65,3 +95,4 @@ class Task(Base):
     params: Mapped[str]
     status: Mapped[str]
     updated_at: Mapped[str]
+    result: Mapped[dict | None] = mapped_column(JSON)  # e.g. backtest metrics
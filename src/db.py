@@ -1,14 +1,25 @@
+import asyncio
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import AsyncGenerator
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import LargeBinary, cast, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import attributes, selectinload
+from sqlalchemy.orm import attributes, defer, noload, selectinload
 from sqlalchemy.pool import StaticPool
 
-from data_models import Base, Forecast, Model, Task, TimeSeries, User
+from data_models import Base, Forecast, Model, PyramidLevel, Task, TimeSeries, User
+from ts.model_cache import series_hash
+from ts.online import append_to_analysis, build_state
+from ts.pyramid import (
+    LEVEL_COLUMNS,
+    build_level,
+    build_pyramid,
+    extend_level,
+    pyramid_sizes,
+)
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -39,7 +50,11 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def get_user_by_login(db: AsyncSession, login: str) -> User | None:
-    result = await db.execute(select(User).filter(User.login == login))
+    # users are looked up on every request, their series (with all the data)
+    # are not loaded for that, get_time_series_ids lists them instead
+    result = await db.execute(
+        select(User).filter(User.login == login).options(noload(User.time_series))
+    )
     return result.scalar_one_or_none()
 
 
@@ -48,6 +63,13 @@ async def get_user_by_id(db: AsyncSession, id: int) -> User | None:
     return result.scalar_one_or_none()
 
 
+async def get_time_series_ids(db: AsyncSession, user_id: int) -> list[int]:
+    result = await db.execute(
+        select(TimeSeries.id).where(TimeSeries.user_id == user_id)
+    )
+    return list(result.scalars())
+
+
 async def create_user(
     db: AsyncSession, login: str, hashed_password: str, name: str, balance: float = 0.0
 ) -> User:
@@ -94,17 +116,102 @@ async def create_time_series(
         created_at=datetime.now().isoformat(),
         length=len(data),
         data=data,
+        data_hash=series_hash(data),
+        lineage=[],
         analysis_results={},
         forecasting_ts=[],
     )
     db.add(db_ts)
+    await db.flush()
+    await store_pyramid(db, db_ts.id, data)
     await db.commit()
     await db.refresh(db_ts)
     return db_ts
 
 
-async def get_time_series_by_id(db: AsyncSession, ts_id: int):
-    result = await db.execute(select(TimeSeries).where(TimeSeries.id == ts_id))
+async def store_pyramid(db: AsyncSession, ts_id: int, data: list[float]):
+    """
+    Заменяет уровни пирамиды просмотра ряда (без commit).
+    """
+    # Numba kernels over the whole series, kept off the event loop
+    levels = await asyncio.get_running_loop().run_in_executor(None, build_pyramid, data)
+    await db.execute(delete(PyramidLevel).where(PyramidLevel.ts_id == ts_id))
+    db.add_all(PyramidLevel(ts_id=ts_id, **level) for level in levels)
+
+
+async def extend_pyramid(db: AsyncSession, ts_id: int, data: list[float], n_obs: int):
+    """
+    Дописывает в уровни пирамиды точки data[n_obs:] (без commit): в базе
+    заменяются только хвосты столбцов уровней начиная с незаполненной
+    корзины. Уровень, которого еще не было, строится по всему ряду.
+    """
+    old_sizes = pyramid_sizes(n_obs)
+    for size in pyramid_sizes(len(data)):
+        if size not in old_sizes:
+            # a new top level appears once per PYRAMID_FACTOR times growth
+            y = np.asarray(data, dtype=np.float64)
+            level = await asyncio.get_running_loop().run_in_executor(
+                None, build_level, y, size
+            )
+            db.add(PyramidLevel(ts_id=ts_id, **level))
+            continue
+
+        first = max(n_obs // size - 1, 0)
+        # the raw level only gets the new points appended
+        columns = (
+            await get_pyramid_slice(db, ts_id, size, first, 2) if size > 1 else None
+        )
+        start, tails = extend_level(columns, size, n_obs, data[n_obs:], data[0])
+        values = {}
+        for name, tail in tails.items():
+            column = getattr(PyramidLevel, name)
+            kept = func.substr(
+                column, 1, start * np.dtype(LEVEL_COLUMNS[name]).itemsize
+            )
+            # || concatenates as text in SQLite, so cast the result back
+            values[name] = cast(kept.op("||")(tail), LargeBinary)
+        await db.execute(
+            update(PyramidLevel)
+            .where(PyramidLevel.ts_id == ts_id, PyramidLevel.bucket_size == size)
+            .values(values)
+        )
+
+
+async def get_pyramid_slice(
+    db: AsyncSession, ts_id: int, bucket_size: int, first: int, count: int
+) -> dict[str, bytes | None] | None:
+    """
+    Корзины first..first+count-1 уровня пирамиды: столбцы режутся substr
+    на стороне базы, так что читается только нужный отрезок уровня.
+    """
+    columns = [
+        func.substr(
+            getattr(PyramidLevel, name),
+            first * np.dtype(dtype).itemsize + 1,
+            count * np.dtype(dtype).itemsize,
+        ).label(name)
+        for name, dtype in LEVEL_COLUMNS.items()
+    ]
+    result = await db.execute(
+        select(*columns).where(
+            PyramidLevel.ts_id == ts_id, PyramidLevel.bucket_size == bucket_size
+        )
+    )
+    row = result.first()
+    return dict(row._mapping) if row else None
+
+
+async def get_time_series_length(db: AsyncSession, ts_id: int) -> int | None:
+    result = await db.execute(select(TimeSeries.length).where(TimeSeries.id == ts_id))
+    return result.scalar_one_or_none()
+
+
+async def get_time_series_by_id(db: AsyncSession, ts_id: int, with_data: bool = True):
+    query = select(TimeSeries).where(TimeSeries.id == ts_id)
+    if not with_data:
+        # metadata only: the series and its smoothed blob stay in the database
+        query = query.options(defer(TimeSeries.data), defer(TimeSeries.smoothed_series))
+    result = await db.execute(query)
     return result.scalars().first()
 
 
@@ -114,12 +221,34 @@ async def delete_time_series(db: AsyncSession, ts_id: int, user_id: int) -> bool
     )
     ts = result.scalar_one_or_none()
     if ts:
+        await db.execute(delete(PyramidLevel).where(PyramidLevel.ts_id == ts_id))
         await db.delete(ts)
         await db.commit()
         return True
     return False
 
 
+async def append_time_series(db: AsyncSession, ts_id: int, data: list[float]):
+    ts = await get_time_series_by_id(db, ts_id)
+
+    ts.analysis_results, ts.analysis_state, smoothed = append_to_analysis(
+        ts.analysis_results, ts.analysis_state or build_state(ts.data), data
+    )
+    attributes.flag_modified(ts, "analysis_state")
+    if ts.smoothed_series is not None:
+        ts.smoothed_series += smoothed.astype(np.float32).tobytes()
+    ts.lineage = [*(ts.lineage or []), [ts.length, ts.data_hash]]
+    n_obs = ts.length
+    ts.data = [*ts.data, *data]
+    ts.length = len(ts.data)
+    ts.data_hash = series_hash(ts.data)
+    await extend_pyramid(db, ts_id, ts.data, n_obs)
+
+    await db.commit()
+    await db.refresh(ts)
+    return ts
+
+
 async def add_forecast_ts_id(db: AsyncSession, ts_id: int, forecast_ts_id: int):
     ts = await get_time_series_by_id(db, ts_id)
 
@@ -152,6 +281,10 @@ async def get_all_models(db: AsyncSession) -> list[Model]:
     return result.scalars().all()
 
 
+async def get_model_tariffs(db: AsyncSession) -> dict[str, float]:
+    return {model.name: model.tariffs for model in await get_all_models(db)}
+
+
 async def create_task(
     db: AsyncSession,
     ts_id: int,
@@ -194,18 +327,109 @@ async def update_task_by_task_id(db: AsyncSession, task_id: int, status: str):
         await db.commit()
 
 
+async def update_task_result(db: AsyncSession, task_id: int, result: dict):
+    task = await db.get(Task, task_id)
+    if task:
+        task.result = result
+        await db.commit()
+
+
+async def get_latest_task_result(
+    db: AsyncSession, ts_id: int, type: str
+) -> Task | None:
+    result = await db.execute(
+        select(Task)
+        .filter(Task.ts_id == ts_id, Task.type == type, Task.status == "done")
+        .order_by(Task.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+def merge_analysis_results(old: dict | None, new: dict) -> dict:
+    """
+    Дописывает результаты посчитанных секций анализа к уже сохраненным.
+    """
+    merged = {key: value for key, value in (old or {}).items() if key != "error"}
+    sections = list(merged.get("sections", []))
+    sections += [s for s in new.get("sections", []) if s not in sections]
+    return {**merged, **new, "sections": sections}
+
+
+def load_smoothed_file(results: dict) -> dict:
+    """
+    Заменяет путь к файлу сглаженного ряда чанкового анализа на сам ряд.
+    """
+    results = dict(results)
+    try:
+        results["smoothed_series"] = np.load(results.pop("smoothed_series_path"))
+    except FileNotFoundError:
+        # the files of a series are removed on append, so the result is stale
+        results["sections"] = [s for s in results["sections"] if s != "smoothing"]
+    return results
+
+
+def store_analysis_results(ts: TimeSeries, results: dict):
+    results = dict(results)
+    smoothed = results.pop("smoothed_series", None)
+    if smoothed is not None:
+        ts.smoothed_series = np.asarray(smoothed, dtype=np.float32).tobytes()
+    ts.analysis_results = merge_analysis_results(ts.analysis_results, results)
+
+
 async def update_analysis_results(db: AsyncSession, ts_id: int, results: dict):
     ts = await db.get(TimeSeries, ts_id)
     if ts:
-        ts.analysis_results = results
+        if "smoothed_series_path" in results:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, load_smoothed_file, results
+            )
+        store_analysis_results(ts, results)
         await db.commit()
 
 
+async def apply_analysis_batch(db: AsyncSession, task_results: list[dict]):
+    """
+    Статусы задач пакетного анализа и их результаты в одной транзакции.
+    """
+    updated_at = datetime.now().isoformat()
+    for task_result in task_results:
+        task = await db.get(Task, task_result["task_id"])
+        if not task:
+            continue
+        task.status = "done" if task_result.get("success") else "failed"
+        task.updated_at = updated_at
+        ts = await db.get(TimeSeries, task.ts_id)
+        if ts and task_result.get("success"):
+            store_analysis_results(ts, task_result["results"])
+        elif ts:
+            store_analysis_results(ts, {"error": task_result.get("error")})
+    await db.commit()
+
+
 async def create_forecast(
-    db: AsyncSession, model: str, fh: int, data: list[float]
+    db: AsyncSession,
+    model: str,
+    fh: int,
+    data: list[float],
+    series_hash: str | None = None,
+    model_used: str | None = None,
+    lower: list[float] | None = None,
+    upper: list[float] | None = None,
+    level: float | None = None,
+    season_lengths: list[int] | None = None,
 ) -> Forecast:
     forecast = Forecast(
-        model=model, fh=fh, data=data, created_at=datetime.now().isoformat()
+        model=model,
+        fh=fh,
+        data=data,
+        series_hash=series_hash,
+        season_key=season_key(season_lengths),
+        model_used=model_used or model,
+        lower=lower,
+        upper=upper,
+        level=level,
+        created_at=datetime.now().isoformat(),
     )
     db.add(forecast)
     await db.commit()
@@ -216,3 +440,34 @@ async def create_forecast(
 async def get_forecast_by_id(db: AsyncSession, forecast_id: int) -> Forecast | None:
     result = await db.execute(select(Forecast).filter(Forecast.id == forecast_id))
     return result.scalar_one_or_none()
+
+
+def season_key(season_lengths: list[int] | None) -> str | None:
+    if season_lengths is None:
+        return None
+    return ",".join(map(str, season_lengths))
+
+
+async def find_cached_forecast(
+    db: AsyncSession,
+    series_hash: str,
+    model: str,
+    fh: int,
+    season_lengths: list[int],
+) -> Forecast | None:
+    """
+    Shortest completed forecast of the same series content, model and season
+    lengths covering fh.
+    """
+    result = await db.execute(
+        select(Forecast)
+        .filter(
+            Forecast.series_hash == series_hash,
+            Forecast.model == model,
+            Forecast.season_key == season_key(season_lengths),
+            Forecast.fh >= fh,
+        )
+        .order_by(Forecast.fh)
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
@@ -0,0 +1,65 @@
+from redis import Redis
+from redis.exceptions import WatchError
+
+INFLIGHT_TTL = 60 * 60  # seconds, longer than any job timeout
+
+
+def inflight_key(series_hash: str, task_type: str, model: str = "", fh: int = 0) -> str:
+    return f"inflight:{series_hash}:{task_type}:{model}:{fh}"
+
+
+def _waiters_key(job_id: str) -> str:
+    return f"inflight:waiters:{job_id}"
+
+
+def register_job(redis_conn: Redis, key: str, job_id: str) -> bool:
+    # if an identical job was registered concurrently, keep the first one
+    return bool(redis_conn.set(key, job_id, ex=INFLIGHT_TTL, nx=True))
+
+
+def attach_to_job(redis_conn: Redis, key: str, task_id: int) -> str | None:
+    """
+    Attaches task to the queued or running job registered under key.
+    Returns id of that job or None if there is nothing to attach to.
+    """
+    job_id = redis_conn.get(key)
+    if job_id is None:
+        return None
+
+    waiters = _waiters_key(job_id.decode())
+    redis_conn.rpush(waiters, task_id)
+    redis_conn.expire(waiters, INFLIGHT_TTL)
+    if redis_conn.get(key) == job_id:
+        return job_id.decode()
+
+    # the job has been processed meanwhile: if our task was not picked up
+    # together with the other waiters, detach it and let the caller enqueue
+    if redis_conn.lrem(waiters, 0, task_id):
+        return None
+    return job_id.decode()
+
+
+def peek_waiting_tasks(redis_conn: Redis, job_id: str) -> list[int]:
+    return [int(task_id) for task_id in redis_conn.lrange(_waiters_key(job_id), 0, -1)]
+
+
+def pop_waiting_tasks(redis_conn: Redis, key: str, job_id: str) -> list[int]:
+    """
+    Unregisters the job and returns all tasks attached to it.
+    Done atomically, so no task can attach after its waiters were taken.
+    """
+    waiters = _waiters_key(job_id)
+    with redis_conn.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key, waiters)
+                owner = pipe.get(key)
+                task_ids = pipe.lrange(waiters, 0, -1)
+                pipe.multi()
+                if owner is not None and owner.decode() == job_id:
+                    pipe.delete(key)
+                pipe.delete(waiters)
+                pipe.execute()
+                return [int(task_id) for task_id in task_ids]
+            except WatchError:
+                continue
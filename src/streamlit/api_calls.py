@@ -74,11 +74,14 @@ def top_up_balance(access_token: str, amount: float) -> dict | None:
         return None
 
 
-def get_time_series(access_token: str, ts_id: int) -> dict | None:
+def get_time_series(
+    access_token: str, ts_id: int, include_data: bool = True
+) -> dict | None:
     try:
         headers = {"Authorization": f"Bearer {access_token}"}
         response = requests.get(
             f"{BACKEND_URL}/time_series/{ts_id}",
+            params={"include_data": include_data},
             headers=headers,
         )
 
@@ -137,6 +140,76 @@ def create_time_series(access_token: str, ts_data: dict) -> dict | None:
         return None
 
 
+def get_analysis_arrays(
+    access_token: str,
+    ts_id: int,
+    arrays: list[str] | None = None,
+    start: int = 0,
+    end: int | None = None,
+    step: int = 1,
+) -> dict | None:
+    try:
+        headers = {"Authorization": f"Bearer {access_token}"}
+        params = {"arrays": arrays or [], "start": start, "step": step}
+        if end is not None:
+            params["end"] = end
+        response = requests.get(
+            f"{BACKEND_URL}/time_series/{ts_id}/analysis_arrays",
+            params=params,
+            headers=headers,
+        )
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+    except requests.exceptions.RequestException:
+        return None
+
+
+def get_time_series_view(
+    access_token: str,
+    ts_id: int,
+    start: int = 0,
+    end: int | None = None,
+    max_points: int = 2000,
+) -> dict | None:
+    try:
+        headers = {"Authorization": f"Bearer {access_token}"}
+        params = {"start": start, "max_points": max_points}
+        if end is not None:
+            params["end"] = end
+        response = requests.get(
+            f"{BACKEND_URL}/time_series/{ts_id}/view",
+            params=params,
+            headers=headers,
+        )
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+    except requests.exceptions.RequestException:
+        return None
+
+
+def start_batch_analysis_task(access_token: str, ts_ids: list[int]) -> dict | None:
+    try:
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = requests.post(
+            f"{BACKEND_URL}/analyze_time_series_batch",
+            json={"ts_ids": ts_ids},
+            headers=headers,
+        )
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+    except requests.exceptions.RequestException:
+        return None
+
+
 def get_analysis_task_status(access_token: str, ts_id: int) -> dict | None:
     try:
         headers = {"Authorization": f"Bearer {access_token}"}
@@ -153,12 +226,14 @@ def get_analysis_task_status(access_token: str, ts_id: int) -> dict | None:
         return None
 
 
-def start_analysis_task(access_token: str, ts_id: int) -> dict | None:
+def start_analysis_task(
+    access_token: str, ts_id: int, sections: list[str] | None = None
+) -> dict | None:
     try:
         headers = {"Authorization": f"Bearer {access_token}"}
         response = requests.post(
             f"{BACKEND_URL}/analyze_time_series",
-            params={"ts_id": ts_id},
+            params={"ts_id": ts_id, "sections": sections or []},
             headers=headers,
         )
 
@@ -197,11 +272,22 @@ def get_forecast_data(access_token: str, forecast_id: int) -> dict | None:
 
 
 def create_forecast_task(
-    access_token: str, ts_id: int, model: str, fh: int, cost: float
+    access_token: str,
+    ts_id: int,
+    model: str,
+    fh: int,
+    cost: float,
+    parallel: bool = False,
 ) -> tuple[bool, dict | str]:
     try:
         headers = {"Authorization": f"Bearer {access_token}"}
-        params = {"ts_id": ts_id, "model": model, "fh": fh, "cost": cost}
+        params = {
+            "ts_id": ts_id,
+            "model": model,
+            "fh": fh,
+            "cost": cost,
+            "parallel": parallel,
+        }
         response = requests.post(
             f"{BACKEND_URL}/forecast_time_series", headers=headers, params=params
         )
@@ -7,6 +7,7 @@ from api_calls import (
     delete_time_series,
     get_time_series,
     get_user_info,
+    start_batch_analysis_task,
     top_up_balance,
 )
 
@@ -191,6 +192,17 @@ if st.session_state.user_info:
     if time_series_ids:
         st.info(f"Количество временных рядов: {len(time_series_ids)}")
 
+        if len(time_series_ids) > 1 and st.button(
+            "Проанализировать все ряды", type="primary"
+        ):
+            result = start_batch_analysis_task(
+                st.session_state.access_token, time_series_ids
+            )
+            if result:
+                st.success("Анализ всех рядов запущен одной задачей!")
+            else:
+                st.error("Не удалось запустить анализ")
+
         for i, ts_id in enumerate(time_series_ids, 1):
             with st.container():
                 st.markdown(f"##### Временной ряд #{i}")
@@ -1,8 +1,16 @@
 import matplotlib.pyplot as plt
-from api_calls import create_forecast_task, get_all_models, get_forecast_data
+from api_calls import (
+    create_forecast_task,
+    get_all_models,
+    get_forecast_data,
+    get_time_series_view,
+)
 
 import streamlit as st
 
+# the history is drawn from the view pyramid, not from the whole series
+HISTORY_MAX_POINTS = 2000
+
 
 def show_current_predictions(in_progress_predictions):
     st.subheader("Текущие прогнозы")
@@ -40,6 +48,7 @@ def show_prediction_history(successful_predictions, ts_data):
     sorted_predictions = sorted(
         successful_predictions, key=lambda x: x["time"], reverse=True
     )
+    history = None
 
     for i, prediction in enumerate(sorted_predictions):
         with st.expander(
@@ -72,24 +81,38 @@ def show_prediction_history(successful_predictions, ts_data):
                         continue
 
                 if forecast_data:
+                    model_used = forecast_data.get("model_used")
+                    if model_used and prediction["model"] == "Auto":
+                        st.info(
+                            f"Автовыбор модели: прогноз построен моделью {model_used}"
+                        )
+                    elif model_used and model_used != prediction["model"]:
+                        st.warning(
+                            f"Модель не уложилась в лимит времени, прогноз построен моделью {model_used}"
+                        )
                     try:
-                        original_data = ts_data.get("data", [])
+                        if history is None:
+                            history = get_time_series_view(
+                                st.session_state.access_token,
+                                ts_data["id"],
+                                max_points=HISTORY_MAX_POINTS,
+                            ) or {"x": [], "y": []}
+                        ts_length = ts_data.get("length", 0)
                         forecast_values = forecast_data.get("data", [])
 
                         fig, ax = plt.subplots(figsize=(12, 6))
 
-                        x_orig = range(len(original_data))
                         ax.plot(
-                            x_orig,
-                            original_data,
+                            history["x"],
+                            history["y"],
                             label="Исходные данные",
                             color="blue",
                             linewidth=1.5,
                         )
 
                         x_forecast = range(
-                            len(original_data),
-                            len(original_data) + len(forecast_values),
+                            ts_length,
+                            ts_length + len(forecast_values),
                         )
                         ax.plot(
                             x_forecast,
@@ -100,6 +123,22 @@ def show_prediction_history(successful_predictions, ts_data):
                             linestyle="--",
                         )
 
+                        lower = forecast_data.get("lower")
+                        upper = forecast_data.get("upper")
+                        if lower and upper:
+                            ax.fill_between(
+                                x_forecast,
+                                lower,
+                                upper,
+                                color="red",
+                                alpha=0.15,
+                                label=(
+                                    f'Интервал {forecast_data["level"]:.0%}'
+                                    if forecast_data.get("level")
+                                    else "Приближенный интервал"
+                                ),
+                            )
+
                         ax.set_xlabel("Временной индекс")
                         ax.set_ylabel("Значение")
                         ax.set_title(
@@ -167,6 +206,12 @@ def show_order_prediction_form(ts_id, user_balance):
         value=10,
     )
 
+    parallel = False
+    if selected_model_name in ("ARIMA", "ETS", "Auto"):
+        parallel = st.checkbox(
+            "Параллельный подбор параметров модели (быстрее, но занимает больше ядер)"
+        )
+
     if selected_model:
         cost = selected_model["tariffs"] * fh
         st.metric("Стоимость прогноза:", f"{cost:.2f} ₽")
@@ -187,10 +232,21 @@ def show_order_prediction_form(ts_id, user_balance):
     if st.button("Заказать прогноз", disabled=not can_order, type="primary"):
         if can_order and selected_model:
             success, result = create_forecast_task(
-                st.session_state.access_token, ts_id, selected_model["name"], fh, cost
+                st.session_state.access_token,
+                ts_id,
+                selected_model["name"],
+                fh,
+                cost,
+                parallel,
             )
 
-            if success:
+            if success and result.get("cache") == "hit":
+                st.success("Такой прогноз уже был рассчитан, результат готов!")
+                st.rerun()
+            elif success and result.get("inline"):
+                st.success("Прогноз рассчитан, результат готов!")
+                st.rerun()
+            elif success:
                 st.success(
                     "Прогноз успешно заказан! Обновите страницу через несколько минут для просмотра результатов."
                 )
@@ -2,6 +2,7 @@ import sys
 
 import pandas as pd
 from api_calls import (
+    get_analysis_arrays,
     get_forecast_data,
     get_forecast_task_status,
     get_time_series,
@@ -102,8 +103,14 @@ with col2:
     st.markdown("#### EMA обработанный ряд")
     analysis_results = ts_data.get("analysis_results", {})
 
-    if analysis_results and "smoothed_series" in analysis_results:
-        smoothed_data = analysis_results["smoothed_series"]
+    smoothed_data = None
+    if analysis_results and "smoothing" in analysis_results.get("sections", []):
+        arrays = get_analysis_arrays(
+            st.session_state.access_token, selected_ts_id, ["smoothed_series"]
+        )
+        smoothed_data = (arrays or {}).get("smoothed_series")
+
+    if smoothed_data is not None:
         st.success(f"Доступно {len(smoothed_data)} точек")
 
         # Prepare CSV
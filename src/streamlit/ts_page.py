@@ -5,9 +5,11 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from api_calls import (
     get_all_models,
+    get_analysis_arrays,
     get_analysis_task_status,
     get_forecast_task_status,
     get_time_series,
+    get_time_series_view,
     get_user_info,
     start_analysis_task,
 )
@@ -56,7 +58,8 @@ if not st.session_state.selected_ts_id:
     st.stop()
 
 ts_id = st.session_state.selected_ts_id
-ts_data = get_time_series(st.session_state.access_token, ts_id)
+# metadata only, the plots below request the points they draw
+ts_data = get_time_series(st.session_state.access_token, ts_id, include_data=False)
 
 if not ts_data:
     st.error(
@@ -96,18 +99,49 @@ with col4:
     st.metric("Размер", f"{size_mb:.4f} MB")
 
 st.markdown("#### График временного ряда")
-data_values = ts_data.get("data", [])
-if data_values:
-    df = pd.DataFrame(
-        {"Временной индекс": range(len(data_values)), "Значение": data_values}
+# the backend returns at most VIEW_MAX_POINTS points of the pyramid level
+# matching the selected range instead of the whole series
+VIEW_MAX_POINTS = 2000
+ts_length = ts_data.get("length", 0)
+if ts_length > 1:
+    view_start, view_end = st.slider(
+        "Отрезок ряда", 0, ts_length, (0, ts_length), key=f"view_range_{ts_id}"
     )
-
+else:
+    view_start, view_end = 0, ts_length
+view = (
+    get_time_series_view(
+        st.session_state.access_token, ts_id, view_start, view_end, VIEW_MAX_POINTS
+    )
+    if view_end > view_start
+    else None
+)
+if view:
     fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(df["Временной индекс"], df["Значение"], linewidth=1.5, color="#1f77b4")
+    if view["bucket_size"] > 1:
+        bucket_start = view["bucket_start"]
+        ax.fill_between(
+            bucket_start,
+            view["min"],
+            view["max"],
+            step="post",
+            color="#1f77b4",
+            alpha=0.2,
+            label="Минимум и максимум",
+        )
+        ax.set_title(
+            f"Временной ряд: {ts_data.get('name', 'N/A')} "
+            f"(по {view['bucket_size']} точек на корзину)"
+        )
+    else:
+        ax.set_title(f"Временной ряд: {ts_data.get('name', 'N/A')}")
+    ax.plot(view["x"], view["y"], linewidth=1.5, color="#1f77b4", label="Ряд")
+    ax.set_xlim(view_start, max(view_end - 1, view_start + 1))
     ax.set_xlabel("Временной индекс")
     ax.set_ylabel("Значение")
-    ax.set_title(f"Временной ряд: {ts_data.get('name', 'N/A')}")
     ax.grid(True, alpha=0.3)
+    if view["bucket_size"] > 1:
+        ax.legend()
     st.pyplot(fig)
     plt.close()
 else:
@@ -116,20 +150,73 @@ else:
 st.markdown("---")
 st.subheader("Анализ временного ряда")
 
-analysis_results = ts_data.get("analysis_results", {})
-has_analysis = bool(analysis_results and analysis_results != {})
+ANALYSIS_SECTIONS = {
+    "stats": "Основные статистики",
+    "frequency": "Частотный анализ",
+    "tests": "Тесты тренда и гетероскедастичности",
+    "smoothing": "Сглаживание (EWM)",
+}
+
+analysis_results = ts_data.get("analysis_results") or {}
+has_analysis = bool(analysis_results)
+# results of older analyses have no list of sections, they have all of them
+done_sections = analysis_results.get("sections", list(ANALYSIS_SECTIONS))
+missing_sections = [s for s in ANALYSIS_SECTIONS if s not in done_sections]
 
 task_status = get_analysis_task_status(st.session_state.access_token, ts_id)
+task_running = bool(
+    task_status
+    and task_status.get("has_task")
+    and task_status.get("status") in ["queued", "in_progress"]
+)
+
+
+def show_start_analysis_form(sections: list[str], button_label: str):
+    col1, col2 = st.columns([1, 3])
+    with col2:
+        selected = st.multiselect(
+            "Секции анализа",
+            sections,
+            default=sections,
+            format_func=ANALYSIS_SECTIONS.get,
+        )
+        st.markdown(
+            "*Анализ предоставляется бесплатно. Анализ поможет понять структуру временного ряда и подготовить данные для прогнозирования. Быстрые секции считаются сразу, остальные - в очереди*"
+        )
+    with col1:
+        if st.button(
+            button_label,
+            type="primary",
+            use_container_width=True,
+            disabled=not selected,
+        ):
+            result = start_analysis_task(st.session_state.access_token, ts_id, selected)
+            if result:
+                st.success("Анализ запущен!")
+                st.rerun()
+            else:
+                st.error("Не удалось запустить анализ")
+
 
 with st.expander("Информация об анализе", expanded=False):
     with open("../data/time_series_analysis_info.txt", "r") as f:
         st.markdown(f.read())
 
 if has_analysis:
-    st.success("Анализ выполнен")
+    if "error" in analysis_results:
+        st.error(f"Ошибка анализа: {analysis_results['error']}")
+    elif missing_sections:
+        st.success("Анализ выполнен частично")
+    else:
+        st.success("Анализ выполнен")
+
+    if task_running:
+        st.info("Остальные секции анализа выполняются в очереди")
+    elif missing_sections:
+        show_start_analysis_form(missing_sections, "Досчитать анализ")
 
     with st.expander("Результаты анализа", expanded=True):
-        if isinstance(analysis_results, dict) and "error" not in analysis_results:
+        if "mean" in analysis_results:
             st.subheader("Основные статистики")
             col1, col2, col3, col4 = st.columns(4)
             with col1:
@@ -144,6 +231,13 @@ if has_analysis:
                 st.metric("25-й процентиль", f"{analysis_results['q25']:.3f}")
                 st.metric("75-й процентиль", f"{analysis_results['q75']:.3f}")
 
+        if "trend_slope" in analysis_results:
+            st.metric(
+                "Наклон линейного тренда (за отсчет)",
+                f"{analysis_results['trend_slope']:.5f}",
+            )
+
+        if "trend_test_result" in analysis_results:
             st.subheader("Анализ тренда")
             col1, col2 = st.columns(2)
             p_val = analysis_results["trend_test_p_value"]
@@ -173,6 +267,7 @@ if has_analysis:
             with col2:
                 st.metric("ARCH тест p-значение", f"{arch_p:.5f}")
 
+        if "fourier_freqs" in analysis_results:
             st.subheader("Частотный анализ")
             freq_data = analysis_results["fourier_freqs"]
             if "frequencies" in freq_data and "amplitudes" in freq_data:
@@ -183,7 +278,16 @@ if has_analysis:
                     }
                 )
                 st.dataframe(freq_df, use_container_width=True)
+            seasonal_periods = analysis_results.get("seasonal_periods")
+            if seasonal_periods:
+                st.write(
+                    "**Периоды сезонности (в отсчетах):** "
+                    + ", ".join(str(period) for period in seasonal_periods)
+                )
+            elif seasonal_periods is not None:
+                st.write("Значимой сезонности не обнаружено")
 
+        if "most_frequent" in analysis_results:
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Наиболее частые значения")
@@ -197,28 +301,45 @@ if has_analysis:
                 for value, count in least_freq.items():
                     st.write(f"**{float(value):.3f}**: {count} раз")
 
+        # full-length arrays are not part of the results, they are loaded
+        # lazily for the selected range, every step-th point
+        analysis_arrays = {}
+        if view and ("trend_slope" in analysis_results or "smoothing" in done_sections):
+            step = -(-(view_end - view_start) // VIEW_MAX_POINTS)
+            analysis_arrays = (
+                get_analysis_arrays(
+                    st.session_state.access_token,
+                    ts_id,
+                    start=view_start,
+                    end=view_end,
+                    step=step,
+                )
+                or {}
+            )
+        x_axis = analysis_arrays.get("x", [])
+        smoothed = analysis_arrays.get("smoothed_series")
+        trend = analysis_arrays.get("linear_trend")
+        if smoothed is not None or trend is not None:
             st.subheader("Графики анализа")
             fig, ax = plt.subplots(figsize=(14, 8))
-            original_data = ts_data.get("data", [])
-            x_axis = range(len(original_data))
-            ax.plot(x_axis, original_data, label="Исходный ряд", alpha=0.7, linewidth=1)
-            smoothed = analysis_results["smoothed_series"]
-            ax.plot(
-                x_axis,
-                smoothed,
-                label="Сглаженный ряд (EWM)",
-                linewidth=2,
-                color="orange",
-            )
-            trend = analysis_results["linear_trend"]
-            ax.plot(
-                x_axis,
-                trend,
-                label="Линейный тренд",
-                linewidth=2,
-                color="red",
-                linestyle="--",
-            )
+            ax.plot(view["x"], view["y"], label="Исходный ряд", alpha=0.7, linewidth=1)
+            if smoothed is not None:
+                ax.plot(
+                    x_axis,
+                    smoothed,
+                    label="Сглаженный ряд (EWM)",
+                    linewidth=2,
+                    color="orange",
+                )
+            if trend is not None:
+                ax.plot(
+                    x_axis,
+                    trend,
+                    label="Линейный тренд",
+                    linewidth=2,
+                    color="red",
+                    linestyle="--",
+                )
 
             ax.set_xlabel("Временной индекс")
             ax.set_ylabel("Значение")
@@ -228,11 +349,10 @@ if has_analysis:
             st.pyplot(fig)
             plt.close()
 
+        residuals = analysis_arrays.get("residuals")
+        if residuals is not None:
             fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
 
-            residuals = analysis_results["residuals"]
-            x_axis = range(len(residuals))
-
             ax1.plot(x_axis, residuals, color="green", alpha=0.8)
             ax1.axhline(y=0, color="red", linestyle="--", alpha=0.7)
             ax1.set_xlabel("Временной индекс")
@@ -251,12 +371,6 @@ if has_analysis:
             st.pyplot(fig)
             plt.close()
 
-        elif isinstance(analysis_results, dict) and "error" in analysis_results:
-            st.error(f"Ошибка анализа: {analysis_results['error']}")
-        else:
-            st.write("Результаты анализа:")
-            st.write(analysis_results)
-
 elif task_status and task_status.get("has_task"):
     status = task_status.get("status")
     updated_at = task_status.get("updated_at")
@@ -280,18 +394,7 @@ elif task_status and task_status.get("has_task"):
         st.write(
             "Произошла ошибка при выполнении анализа. Попробуйте запустить анализ заново."
         )
-
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            if st.button("Повторить анализ", type="primary", use_container_width=True):
-                result = start_analysis_task(st.session_state.access_token, ts_id)
-                if result:
-                    st.success("Анализ запущен повторно!")
-                    st.rerun()
-                else:
-                    st.error("Не удалось запустить анализ")
-        with col2:
-            st.markdown("*Анализ предоставляется бесплатно*")
+        show_start_analysis_form(list(ANALYSIS_SECTIONS), "Повторить анализ")
 
     elif status == "done":
         st.warning("Анализ завершен, но результаты не загружены")
@@ -301,19 +404,7 @@ elif task_status and task_status.get("has_task"):
 
 else:
     st.info("Анализ не выполнен")
-    col1, col2 = st.columns([1, 3])
-    with col1:
-        if st.button("Запустить анализ", type="primary", use_container_width=True):
-            result = start_analysis_task(st.session_state.access_token, ts_id)
-            if result:
-                st.success("Анализ запущен!")
-                st.rerun()
-            else:
-                st.error("Не удалось запустить анализ")
-    with col2:
-        st.markdown(
-            "*Анализ предоставляется бесплатно. Анализ поможет понять структуру временного ряда и подготовить данные для прогнозирования*"
-        )
+    show_start_analysis_form(list(ANALYSIS_SECTIONS), "Запустить анализ")
 
 st.markdown("---")
 st.subheader("Прогнозирование")
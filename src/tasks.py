@@ -1,15 +1,32 @@
 import logging
+import time
+from pathlib import Path
 
-from ts.analyze import analyze_time_series
-from ts.forecast import forecast, train_model
+from ts.analyze import analyze_many, analyze_time_series
+from ts.backtest import backtest
+from ts.chunked import analyze_series_file
+from ts.conformal import forecast_intervals
+from ts.forecast import (
+    PARALLEL_MODELS,
+    forecast,
+    forecast_many,
+    forecast_models,
+    get_fitted_model,
+    train_model,
+    train_model_parallel,
+    train_model_with_budget,
+)
+from ts.selection import AUTO_MODEL_NAME, SELECTION_BUDGET_SHARE, select_model
 
 
-def task_analyze_time_series(ts_data: list[float], task_id: str):
+def task_analyze_time_series(
+    ts_data: list[float], task_id: str, sections: list[str] | None = None
+):
     logging.info(f"Starting analysis for task {task_id}")
     try:
         if not ts_data or not isinstance(ts_data, list):
             raise ValueError("Invalid time series data provided")
-        analysis_results = analyze_time_series(ts_data)
+        analysis_results = analyze_time_series(ts_data, sections)
         logging.info(f"Analysis completed successfully for task {task_id}")
         return {"success": True, "task_id": task_id, "results": analysis_results}
 
@@ -18,21 +35,326 @@ def task_analyze_time_series(ts_data: list[float], task_id: str):
         return {"success": False, "task_id": task_id, "error": str(e)}
 
 
-def task_forecast_time_series(ts_data: list[float], task_id: str, model: str, fh: int):
+def task_analyze_batch(items: list[dict], sections: list[str] | None = None):
+    """
+    Пакетный анализ: ряды одной длины анализируются вместе, а при ошибке
+    группы - по одному, так что ошибка ряда не влияет на остальные ряды.
+    """
+    task_ids = [item["task_id"] for item in items]
+    logging.info(f"Starting batch analysis for tasks {task_ids}")
+    task_results = {}
+    by_length = {}
+    for item in items:
+        if not item["ts_data"] or not isinstance(item["ts_data"], list):
+            task_results[item["task_id"]] = {
+                "success": False,
+                "task_id": item["task_id"],
+                "error": "Invalid time series data provided",
+            }
+        else:
+            by_length.setdefault(len(item["ts_data"]), []).append(item)
+
+    groups = list(by_length.values())
+    while groups:
+        group = groups.pop()
+        try:
+            analysis_results = analyze_many(
+                [item["ts_data"] for item in group], sections
+            )
+        except Exception as e:
+            if len(group) > 1:
+                # the failing series is found by analyzing the group one by one
+                groups += [[item] for item in group]
+                continue
+            analysis_results = [e]
+        for item, results in zip(group, analysis_results):
+            if isinstance(results, Exception):
+                logging.error(
+                    f"Analysis failed for task {item['task_id']}: {str(results)}"
+                )
+                task_results[item["task_id"]] = {
+                    "success": False,
+                    "task_id": item["task_id"],
+                    "error": f"An unexpected error occurred: {results}",
+                }
+            else:
+                task_results[item["task_id"]] = {
+                    "success": True,
+                    "task_id": item["task_id"],
+                    "results": results,
+                }
+
+    logging.info(f"Batch analysis completed for tasks {task_ids}")
+    return {
+        "success": any(result["success"] for result in task_results.values()),
+        "type": "analyze_batch",
+        "tasks": [task_results[task_id] for task_id in task_ids],
+    }
+
+
+def task_analyze_series_file(
+    path: str, task_id: str, sections: list[str] | None = None
+):
+    """
+    Анализ длинного ряда по кускам из .npy/Arrow файла в ограниченной памяти.
+    Файл удаляется после анализа.
+    """
+    logging.info(f"Starting chunked analysis for task {task_id}")
+    try:
+        analysis_results = analyze_series_file(path, sections)
+        logging.info(f"Chunked analysis completed successfully for task {task_id}")
+        return {"success": True, "task_id": task_id, "results": analysis_results}
+
+    except Exception as e:
+        logging.error(f"Chunked analysis failed for task {task_id}: {str(e)}")
+        return {"success": False, "task_id": task_id, "error": str(e)}
+
+    finally:
+        Path(path).unlink(missing_ok=True)
+
+
+def task_forecast_time_series(
+    ts_data: list[float],
+    task_id: str,
+    model: str,
+    fh: int,
+    season_lengths: list[int] | None = None,
+    time_budget: float | None = None,
+    parallel: bool = False,
+    lineage: list[tuple[int, str]] | None = None,
+    calibration_errors: dict[str, list[list[float]]] | None = None,
+    use_cache: bool = True,
+):
     logging.info(f"Starting forecast for task {task_id}")
     try:
         if not ts_data or not isinstance(ts_data, list):
             raise ValueError("Invalid time series data provided")
-        forecast_results = forecast(train_model(model, ts_data), fh)
-        logging.info(f"Forecast completed successfully for task {task_id}")
+        model_used = model
+        if model == AUTO_MODEL_NAME:
+            start = time.monotonic()
+            model_used = select_model(
+                ts_data,
+                fh,
+                season_lengths=season_lengths,
+                time_budget=time_budget and time_budget * SELECTION_BUDGET_SHARE,
+            )
+            logging.info(f"Model {model_used} selected for task {task_id}")
+            if time_budget:
+                time_budget -= time.monotonic() - start
+        selected_model = model_used
+        if parallel and model_used in PARALLEL_MODELS:
+            fitted_model, model_used = train_model_parallel(
+                model_used, ts_data, season_lengths, time_budget
+            )
+        elif time_budget:
+            fitted_model, model_used = train_model_with_budget(
+                model_used, ts_data, season_lengths, time_budget, lineage
+            )
+        elif use_cache:
+            fitted_model = get_fitted_model(
+                model_used, ts_data, season_lengths, lineage
+            )
+        else:
+            # refitting cheap kernels costs less than hashing and pickling
+            fitted_model = train_model(model_used, ts_data, season_lengths)
+        forecast_results = forecast(fitted_model, fh)
+        logging.info(
+            f"Forecast completed successfully for task {task_id} with {model_used}"
+        )
+        try:
+            intervals = forecast_intervals(
+                model_used,
+                fitted_model,
+                ts_data,
+                forecast_results,
+                calibration_errors,
+            )
+        except Exception as e:
+            logging.warning(f"Intervals failed for task {task_id}: {str(e)}")
+            intervals = None
+        lower, upper, level = intervals or (None, None, None)
         return {
             "success": True,
             "task_id": task_id,
             "results": forecast_results,
+            "lower": lower,
+            "upper": upper,
+            "level": level,
             "model": model,
+            "model_used": model_used,
+            "fallback": model_used != selected_model,
             "fh": fh,
+            "season_lengths": season_lengths,
         }
 
     except Exception as e:
         logging.error(f"Forecast failed for task {task_id}: {str(e)}")
         return {"success": False, "task_id": task_id, "error": str(e)}
+
+
+def task_forecast_batch(items: list[dict]):
+    """
+    Пакетный прогноз: ошибка одного ряда или группы рядов одной модели
+    не влияет на прогнозы остальных рядов пакета.
+    """
+    task_ids = [item["task_id"] for item in items]
+    logging.info(f"Starting batch forecast for tasks {task_ids}")
+    valid = [
+        item
+        for item in items
+        if item["ts_data"] and isinstance(item["ts_data"], list) and item["fh"] > 0
+    ]
+    try:
+        forecasts = forecast_many(
+            [
+                (
+                    item["model"],
+                    item["ts_data"],
+                    item["fh"],
+                    item.get("season_lengths"),
+                )
+                for item in valid
+            ]
+        )
+    except Exception as e:
+        forecasts = [e] * len(valid)
+    forecasts = dict(zip((item["task_id"] for item in valid), forecasts))
+
+    task_results = []
+    for item in items:
+        forecast_results = forecasts.get(
+            item["task_id"], ValueError("Invalid time series data provided")
+        )
+        if isinstance(forecast_results, Exception):
+            logging.error(
+                f"Forecast failed for task {item['task_id']}: {str(forecast_results)}"
+            )
+            task_results.append(
+                {
+                    "success": False,
+                    "task_id": item["task_id"],
+                    "error": str(forecast_results),
+                }
+            )
+        else:
+            task_results.append(
+                {
+                    "success": True,
+                    "task_id": item["task_id"],
+                    "results": forecast_results,
+                    "model": item["model"],
+                    "fh": item["fh"],
+                    "season_lengths": item.get("season_lengths"),
+                }
+            )
+
+    logging.info(f"Batch forecast completed for tasks {task_ids}")
+    return {
+        "success": any(result["success"] for result in task_results),
+        "tasks": task_results,
+    }
+
+
+def task_forecast_time_series_models(
+    ts_data: list[float], tasks: list[dict], season_lengths: list[int] | None = None
+):
+    task_ids = [task["task_id"] for task in tasks]
+    logging.info(f"Starting multi-model forecast for tasks {task_ids}")
+    try:
+        if not ts_data or not isinstance(ts_data, list):
+            raise ValueError("Invalid time series data provided")
+        fhs = list(dict.fromkeys(task["fh"] for task in tasks))
+        # "Auto" is resolved to the selected model, fitted along with the others
+        models_used = {task["model"]: task["model"] for task in tasks}
+        if AUTO_MODEL_NAME in models_used:
+            try:
+                models_used[AUTO_MODEL_NAME] = select_model(
+                    ts_data, max(fhs), season_lengths=season_lengths
+                )
+            except Exception as e:
+                models_used[AUTO_MODEL_NAME] = e
+        model_names = list(
+            dict.fromkeys(
+                model for model in models_used.values() if isinstance(model, str)
+            )
+        )
+        forecasts = (
+            forecast_models(ts_data, model_names, fhs, season_lengths)
+            if model_names
+            else {}
+        )
+        results = []
+        for task in tasks:
+            model_used = models_used[task["model"]]
+            model_forecasts = (
+                forecasts[model_used] if isinstance(model_used, str) else model_used
+            )
+            if isinstance(model_forecasts, Exception):
+                logging.error(
+                    f"Forecast failed for task {task['task_id']}: {model_forecasts}"
+                )
+                results.append(
+                    {
+                        "success": False,
+                        "task_id": task["task_id"],
+                        "error": str(model_forecasts),
+                    }
+                )
+                continue
+            results.append(
+                {
+                    "success": True,
+                    "task_id": task["task_id"],
+                    "results": model_forecasts[task["fh"]],
+                    "model": task["model"],
+                    "model_used": model_used,
+                    "fh": task["fh"],
+                    "season_lengths": season_lengths,
+                }
+            )
+        logging.info(f"Multi-model forecast completed for tasks {task_ids}")
+        return {"success": True, "tasks": results}
+
+    except Exception as e:
+        logging.error(f"Multi-model forecast failed for tasks {task_ids}: {str(e)}")
+        return {
+            "success": False,
+            "tasks": [
+                {"success": False, "task_id": task_id, "error": str(e)}
+                for task_id in task_ids
+            ],
+        }
+
+
+def task_backtest_time_series(
+    ts_data: list[float],
+    task_id: str,
+    models: list[str],
+    h: int,
+    n_windows: int,
+    season_lengths: list[int] | None = None,
+    data_hash: str | None = None,
+):
+    logging.info(f"Starting backtest for task {task_id}")
+    try:
+        if not ts_data or not isinstance(ts_data, list):
+            raise ValueError("Invalid time series data provided")
+        backtest_results = backtest(
+            ts_data, models, h, n_windows, season_lengths=season_lengths
+        )
+        logging.info(f"Backtest completed successfully for task {task_id}")
+        return {
+            "success": True,
+            "task_id": task_id,
+            # the series version the errors belong to, checked before they
+            # calibrate forecast intervals
+            "results": {
+                **backtest_results,
+                "data_hash": data_hash,
+                "season_lengths": season_lengths,
+            },
+        }
+
+    except Exception as e:
+        logging.error(f"Backtest failed for task {task_id}: {str(e)}")
+        return {"success": False, "task_id": task_id, "error": str(e)}
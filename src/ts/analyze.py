@@ -1,85 +1,185 @@
 import numpy as np
 import pandas as pd
-import pymannkendall as mk
-from statsmodels.stats.diagnostic import het_arch
+from scipy.signal import lfilter
+
+from ts.arch import arch_lm_test_batch
+from ts.kernels import describe_sorted, detrend
+from ts.mann_kendall import mann_kendall_test
+from ts.spectral import get_spectral_analysis_many
+
+FREQUENT_VALUES_COUNT = 3
+EWM_SPAN = 12
+
+# Секции анализа считаются сразу для 2D-массива рядов одинаковой длины
+# (ряд - строка) и возвращают список результатов по рядам
+
+
+def get_simple_stats_many(y: np.ndarray) -> list[dict]:
+    results = []
+    # numpy's sort is faster than the one compiled by numba
+    for row in np.sort(y, axis=1):
+        (
+            mean,
+            std,
+            min_value,
+            q25,
+            median,
+            q75,
+            max_value,
+            top_values,
+            top_counts,
+            bottom_values,
+            bottom_counts,
+        ) = describe_sorted(row, FREQUENT_VALUES_COUNT)
+        results.append(
+            {
+                "mean": mean,
+                "median": median,
+                "std": std,
+                "q25": q25,
+                "q75": q75,
+                "min": min_value,
+                "max": max_value,
+                "most_frequent": dict(zip(top_values.tolist(), top_counts.tolist())),
+                "least_frequent": dict(
+                    zip(bottom_values.tolist(), bottom_counts.tolist())
+                ),
+            }
+        )
+    return results
+
+
+def get_statistical_tests_many(y: np.ndarray) -> list[dict]:
+    # Линейный тренд (хранятся только коэффициенты, прямая и остатки
+    # восстанавливаются по ним)
+    slopes, intercepts, residuals = detrend(y)
 
+    # ARCH-тест
+    arch_stats, arch_p_values = arch_lm_test_batch(residuals)
+
+    results = []
+    for i in range(len(y)):
+        # Тест Манна-Кендалла
+        trend_test = mann_kendall_test(y[i])
+        results.append(
+            {
+                "trend_test_result": trend_test["trend"],
+                "trend_test_p_value": trend_test["p"],
+                "trend_slope": float(slopes[i]),
+                "trend_intercept": float(intercepts[i]),
+                "arch_test_stat": float(arch_stats[i]),
+                "arch_test_p_value": float(arch_p_values[i]),
+            }
+        )
+    return results
+
+
+def get_smoothed_series_many(y: np.ndarray) -> list[dict]:
+    # EWM with adjust=False as a linear filter, started from the first value
+    alpha = 2 / (EWM_SPAN + 1)
+    smoothed, _ = lfilter([alpha], [1, alpha - 1], y, axis=1, zi=(1 - alpha) * y[:, :1])
+    # stored as a compact float32 blob, not inside the JSON results
+    return [{"smoothed_series": row} for row in smoothed.astype(np.float32)]
 
-def get_simple_stats(series: pd.Series) -> dict:
-    desc = series.describe(percentiles=[0.25, 0.75])
-    stats = {
-        "mean": desc["mean"],
-        "median": desc["50%"],
-        "std": desc["std"],
-        "q25": desc["25%"],
-        "q75": desc["75%"],
-        "min": desc["min"],
-        "max": desc["max"],
-        "most_frequent": series.value_counts().nlargest(3).to_dict(),
-        "least_frequent": series.value_counts().nsmallest(3).to_dict(),
-    }
-    return stats
-
-
-def get_frequency_analysis(series: pd.Series) -> dict:
-    fft_result = np.fft.fft(series.values)
-    fft_freq = np.fft.fftfreq(len(series))
-
-    positive_freq_indices = np.where(fft_freq > 0)
-    positive_freqs = fft_freq[positive_freq_indices]
-    positive_fft_result = np.abs(fft_result[positive_freq_indices])
-
-    sorted_indices = np.argsort(positive_fft_result)[::-1]
-
-    significant_freqs = {
-        "frequencies": positive_freqs[sorted_indices[:3]].tolist(),
-        "amplitudes": positive_fft_result[sorted_indices[:3]].tolist(),
-    }
-
-    return {"fourier_freqs": significant_freqs}
 
+def get_simple_stats(series: pd.Series) -> dict:
+    return get_simple_stats_many(series.to_numpy(dtype=np.float64).reshape(1, -1))[0]
 
-def get_statistical_tests(series: pd.Series) -> dict:
-    # Тест Манна-Кендалла
-    trend_test = mk.original_test(series)
 
-    # Линейный тренд
-    x = np.arange(len(series))
-    slope, intercept = np.polyfit(x, series, 1)
-    trend_line = slope * x + intercept
+ANALYSIS_SECTIONS = {
+    "stats": get_simple_stats_many,
+    "frequency": get_spectral_analysis_many,
+    "tests": get_statistical_tests_many,
+    "smoothing": get_smoothed_series_many,
+}
+# approximate seconds per million points on one core
+SECTION_COSTS = {"stats": 0.02, "smoothing": 0.07, "frequency": 0.15, "tests": 0.5}
 
-    # ARCH-тест
-    residuals = series - trend_line
-    arch_test = het_arch(residuals)
 
-    return {
-        "trend_test_result": trend_test.trend,
-        "trend_test_p_value": trend_test.p,
-        "linear_trend": trend_line.tolist(),
-        "arch_test_stat": arch_test[0],
-        "arch_test_p_value": arch_test[1],
-        "residuals": residuals.tolist(),
-    }
+def split_sections(
+    sections: list[str], n_obs: int, time_budget: float
+) -> tuple[list[str], list[str]]:
+    """
+    Делит секции анализа на те, что укладываются в бюджет времени time_budget
+    (в секундах, от самых дешевых), и остальные, которые уходят в очередь.
+    """
+    inline, queued = [], []
+    spent = 0.0
+    for section in sorted(sections, key=SECTION_COSTS.get):
+        cost = SECTION_COSTS[section] * n_obs / 1e6
+        if spent + cost <= time_budget:
+            inline.append(section)
+            spent += cost
+        else:
+            queued.append(section)
+    return inline, queued
+
+
+ANALYSIS_ARRAYS = ["linear_trend", "residuals", "smoothed_series"]
+
+
+def rebuild_analysis_arrays(
+    series: list[float],
+    results: dict,
+    smoothed_series: bytes | None,
+    arrays: list[str] = ANALYSIS_ARRAYS,
+    start: int = 0,
+    end: int | None = None,
+    step: int = 1,
+) -> dict:
+    """
+    Массивы анализа, которые не хранятся в analysis_results: линейный тренд и
+    остатки - по коэффициентам тренда, сглаженный ряд - из float32 блоба.
+    Отдаются только запрошенные и уже посчитанные массивы в точках
+    range(start, end, step), индексы точек - в "x".
+    """
+    x = np.arange(len(series))[start:end:step]
+    rebuilt = {"x": x.tolist()}
+    if "trend_slope" in results:
+        y = np.asarray(series[start:end:step], dtype=np.float64)
+        trend = results["trend_intercept"] + results["trend_slope"] * x
+        if "linear_trend" in arrays:
+            rebuilt["linear_trend"] = trend.tolist()
+        if "residuals" in arrays:
+            rebuilt["residuals"] = (y - trend).tolist()
+    if "smoothed_series" in arrays and smoothed_series is not None:
+        rebuilt["smoothed_series"] = np.frombuffer(smoothed_series, dtype=np.float32)[
+            start:end:step
+        ].tolist()
+    return rebuilt
+
+
+def analyze_many(
+    series: list[list[float]], sections: list[str] | None = None
+) -> list[dict]:
+    """
+    Анализ нескольких рядов: ряды одинаковой длины складываются в 2D-массив,
+    и каждая секция считается по нему одним векторизованным вызовом.
+    """
+    sections = list(ANALYSIS_SECTIONS) if sections is None else sections
+    results = [{} for _ in series]
 
+    by_length = {}
+    for i, values in enumerate(series):
+        by_length.setdefault(len(values), []).append(i)
+    for indices in by_length.values():
+        y = np.array([series[i] for i in indices], dtype=np.float64)
+        for section in sections:
+            for i, section_results in zip(indices, ANALYSIS_SECTIONS[section](y)):
+                results[i].update(section_results)
 
-def get_smoothed_series(series: pd.Series) -> dict:
-    smoothed = series.ewm(span=12, adjust=False).mean()
-    return {"smoothed_series": smoothed.tolist()}
+    for series_results in results:
+        series_results["sections"] = sections
+    return results
 
 
-def analyze_time_series(series: list[float]) -> dict:
+def analyze_time_series(series: list[float], sections: list[str] | None = None) -> dict:
     """
-    Полный анализ временного ряда.
+    Анализ временного ряда по выбранным секциям (по умолчанию - по всем).
+    Список посчитанных секций сохраняется под ключом "sections".
     """
     try:
-        series = pd.Series(series)
-
-        results = {}
-        results.update(get_simple_stats(series))
-        results.update(get_frequency_analysis(series))
-        results.update(get_statistical_tests(series))
-        results.update(get_smoothed_series(series))
-
-        return results
+        return analyze_many([series], sections)[0]
 
     except Exception as e:
         return {"error": f"An unexpected error occurred: {e}"}
@@ -0,0 +1,31 @@
+import numpy as np
+from scipy.stats import chi2
+
+from ts.kernels import arch_lm
+
+MAX_ARCH_LAGS = 10
+
+
+def get_arch_lags(n_obs: int, nlags: int | None = None) -> int:
+    # same default as statsmodels' het_arch
+    return nlags if nlags is not None else min(MAX_ARCH_LAGS, n_obs // 5)
+
+
+def arch_lm_test_batch(
+    residuals: np.ndarray, nlags: int | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    LM тест ARCH сразу для 2D-массива остатков равной длины (ряд - строка).
+    Возвращает статистики и p-значения, совпадающие с het_arch из statsmodels.
+    """
+    residuals = np.asarray(residuals, dtype=np.float64)
+    nlags = get_arch_lags(residuals.shape[1], nlags)
+    lm = arch_lm(residuals, nlags)
+    return lm, chi2.sf(lm, nlags)
+
+
+def arch_lm_test(
+    residuals: np.ndarray, nlags: int | None = None
+) -> tuple[float, float]:
+    lm, p_value = arch_lm_test_batch(np.asarray(residuals).reshape(1, -1), nlags)
+    return float(lm[0]), float(p_value[0])
@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import pandas as pd
+from statsforecast import StatsForecast
+
+from ts.forecast import ALL_MODELS, build_model, forecast, train_model
+
+MIN_TRAIN_LENGTH = 20
+
+
+def get_cutoffs(n_obs: int, h: int, n_windows: int, step_size: int | None = None):
+    """
+    Точки отсечения rolling-origin окон: окно k обучается на series[:cutoff]
+    и проверяется на series[cutoff:cutoff + h].
+    """
+    step_size = step_size or h
+    cutoffs = [n_obs - h - step_size * (n_windows - 1 - k) for k in range(n_windows)]
+    if cutoffs[0] < MIN_TRAIN_LENGTH:
+        raise ValueError(
+            f"Series is too short for {n_windows} windows of horizon {h}: "
+            f"first window would train on {cutoffs[0]} observations"
+        )
+    return cutoffs
+
+
+def get_metrics(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    errors = actual - predicted
+    nonzero = actual != 0
+    return {
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors**2))),
+        "mape": (
+            float(np.mean(np.abs(errors[nonzero] / actual[nonzero])) * 100)
+            if nonzero.any()
+            else None
+        ),
+    }
+
+
+def _predict_windows_statsforecast(
+    model_name: str,
+    series: np.ndarray,
+    cutoffs: list[int],
+    h: int,
+    season_lengths: list[int] | None,
+    starts: list[int],
+    model_params: dict | None,
+) -> list[np.ndarray]:
+    # every window becomes its own series, so StatsForecast spreads
+    # the windows across worker processes
+    lengths = [cutoff + h - start for start, cutoff in zip(starts, cutoffs)]
+    df = pd.DataFrame(
+        {
+            "unique_id": np.repeat(np.arange(len(cutoffs)), lengths),
+            "ds": np.concatenate([np.arange(n) for n in lengths]),
+            "y": np.concatenate(
+                [series[start : cutoff + h] for start, cutoff in zip(starts, cutoffs)]
+            ),
+        }
+    )
+    model = build_model(model_name, season_lengths, **(model_params or {}))
+    sf = StatsForecast(models=[model], freq=1, n_jobs=-1)
+    cv = sf.cross_validation(df=df, h=h, n_windows=1)
+
+    return [
+        group[model.alias].to_numpy()
+        for _, group in cv.sort_values(["unique_id", "ds"]).groupby("unique_id")
+    ]
+
+
+def predict_windows(
+    model_name: str,
+    series: np.ndarray,
+    cutoffs: list[int],
+    h: int,
+    season_lengths: list[int] | None = None,
+    train_length: int | None = None,
+    model_params: dict | None = None,
+) -> list[np.ndarray]:
+    """
+    Прогнозы модели на h шагов, обученной на series[:cutoff] для каждой точки
+    отсечения (или на последних train_length точках перед ней). model_params
+    сужают перебор моделей statsforecast.
+    """
+    starts = [max(cutoff - (train_length or cutoff), 0) for cutoff in cutoffs]
+    if hasattr(ALL_MODELS[model_name], "forecast_batch"):
+        return [
+            np.asarray(
+                forecast(
+                    train_model(model_name, series[start:cutoff], season_lengths), h
+                )
+            )
+            for start, cutoff in zip(starts, cutoffs)
+        ]
+    return _predict_windows_statsforecast(
+        model_name, series, cutoffs, h, season_lengths, starts, model_params
+    )
+
+
+def backtest(
+    series: list[float],
+    model_names: list[str],
+    h: int,
+    n_windows: int,
+    step_size: int | None = None,
+    season_lengths: list[int] | None = None,
+) -> dict:
+    """
+    Rolling-origin кросс-валидация моделей на одном ряде.
+    Для каждой модели возвращает MAE, RMSE и MAPE по окнам и в среднем,
+    ошибки прогноза по шагам горизонта и время обучения.
+    """
+    for model_name in model_names:
+        if model_name not in ALL_MODELS:
+            raise ValueError(f"Unknown model: {model_name}")
+
+    series = np.asarray(series, dtype=np.float64)
+    cutoffs = get_cutoffs(len(series), h, n_windows, step_size)
+
+    results = {}
+    for model_name in model_names:
+        start = time.perf_counter()
+        predictions = predict_windows(model_name, series, cutoffs, h, season_lengths)
+        fit_time = time.perf_counter() - start
+
+        windows = []
+        for cutoff, predicted in zip(cutoffs, predictions):
+            actual = series[cutoff : cutoff + h]
+            windows.append(
+                {
+                    "cutoff": cutoff,
+                    **get_metrics(actual, predicted),
+                    "errors": (actual - predicted).tolist(),
+                }
+            )
+
+        mapes = [w["mape"] for w in windows if w["mape"] is not None]
+        results[model_name] = {
+            "mae": float(np.mean([w["mae"] for w in windows])),
+            "rmse": float(np.mean([w["rmse"] for w in windows])),
+            "mape": float(np.mean(mapes)) if mapes else None,
+            "fit_time": fit_time,
+            "fit_time_per_window": fit_time / len(cutoffs),
+            "windows": windows,
+        }
+
+    return {"h": h, "n_windows": len(cutoffs), "models": results}
@@ -0,0 +1,150 @@
+import os
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pyarrow as pa
+from scipy.signal import welch
+
+from ts.online import empty_state, ewm_extend, get_online_stats, get_trend, update_state
+from ts.spectral import (
+    TOP_FREQUENCIES,
+    WELCH_MIN_LENGTH,
+    WELCH_SEGMENT_LENGTH,
+    get_seasonal_periods,
+    get_spectrum,
+    top_k_indices,
+    welch_amplitudes,
+)
+
+SERIES_DIR = Path(os.getenv("SERIES_DIR", ".series"))
+# points per chunk, a multiple of the Welch segment step
+CHUNK_SIZE = 2**20
+CHUNKED_SECTIONS = ["stats", "frequency", "smoothing"]
+
+WELCH_STEP = WELCH_SEGMENT_LENGTH // 2
+
+
+def save_series(data: list[float], name: str) -> Path:
+    """
+    Сохраняет ряд в .npy файл каталога SERIES_DIR, откуда его читает воркер.
+    """
+    SERIES_DIR.mkdir(parents=True, exist_ok=True)
+    path = SERIES_DIR / f"{name}.npy"
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, np.asarray(data, dtype=np.float64))
+    tmp_path.replace(path)
+    return path
+
+
+def remove_series_files(prefix: str):
+    """
+    Удаляет файлы рядов SERIES_DIR, имена которых начинаются с prefix.
+    """
+    for path in SERIES_DIR.glob(f"{prefix}*.npy"):
+        path.unlink(missing_ok=True)
+
+
+def open_series(path: str | Path) -> tuple[int, Callable[[int, int], np.ndarray]]:
+    """
+    Открывает ряд из .npy файла или из первого столбца файла Arrow IPC
+    (.arrow, .feather) через отображение в память. Возвращает длину ряда и
+    функцию чтения отрезка [start, stop) в float64.
+    """
+    path = Path(path)
+    if path.suffix == ".npy":
+        array = np.load(path, mmap_mode="r")
+        return len(array), lambda start, stop: np.array(
+            array[start:stop], dtype=np.float64
+        )
+
+    column = pa.ipc.open_file(pa.memory_map(str(path))).read_all().column(0)
+    return len(column), lambda start, stop: (
+        column.slice(start, stop - start).to_numpy().astype(np.float64)
+    )
+
+
+def iter_chunks(
+    n_obs: int, read: Callable[[int, int], np.ndarray]
+) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Начала и куски ряда по CHUNK_SIZE точек. Вместе с куском отдается он же,
+    продолженный на полсегмента Уэлча, чтобы сегменты на стыках не терялись.
+    """
+    for start in range(0, n_obs, CHUNK_SIZE):
+        block = read(start, min(start + CHUNK_SIZE + WELCH_STEP, n_obs))
+        yield start, block[:CHUNK_SIZE], block
+
+
+def analyze_series_file(
+    path: str | Path,
+    sections: list[str] | None = None,
+    smoothed_path: str | Path | None = None,
+) -> dict:
+    """
+    Анализ ряда из файла за один проход по кускам в ограниченной памяти
+    (секции из CHUNKED_SECTIONS): простые статистики (без частот значений,
+    квартили - по t-digest) и тренд, сглаженный ряд (float32, пишется по
+    кускам в .npy файл smoothed_path, путь - smoothed_series_path) и
+    периодограмма Уэлча, усредненная по сегментам всех кусков (совпадает с
+    welch по всему ряду).
+    """
+    smoothed = None
+    try:
+        sections = CHUNKED_SECTIONS if sections is None else sections
+        n_obs, read = open_series(path)
+        welch_needed = "frequency" in sections and n_obs > WELCH_MIN_LENGTH
+        if "smoothing" in sections:
+            smoothed_path = Path(
+                smoothed_path or Path(path).with_suffix(".smoothed.npy")
+            )
+            smoothed = np.lib.format.open_memmap(
+                smoothed_path, mode="w+", dtype=np.float32, shape=(n_obs,)
+            )
+
+        state = empty_state(count_values=False)
+        psd_sum, n_segments = 0.0, 0
+        for start, chunk, block in iter_chunks(n_obs, read):
+            if smoothed is not None:
+                smoothed[start : start + len(chunk)] = ewm_extend(state["ewm"], chunk)
+            state = update_state(state, chunk)
+
+            block_segments = (len(block) - WELCH_SEGMENT_LENGTH) // WELCH_STEP + 1
+            if welch_needed and block_segments > 0:
+                frequencies, psd = welch(
+                    block, nperseg=WELCH_SEGMENT_LENGTH, detrend="linear"
+                )
+                psd_sum = psd_sum + psd * block_segments
+                n_segments += block_segments
+
+        results = {"sections": [s for s in CHUNKED_SECTIONS if s in sections]}
+        if "stats" in sections:
+            slope, intercept = get_trend(state)
+            results.update(
+                get_online_stats(state), trend_slope=slope, trend_intercept=intercept
+            )
+        if "frequency" in sections:
+            if welch_needed:
+                frequencies = frequencies[1:]
+                amplitudes = welch_amplitudes(psd_sum[1:] / n_segments, n_obs)
+            else:
+                # short series fit in memory as a whole
+                frequencies, amplitudes = get_spectrum(read(0, n_obs))
+            top = top_k_indices(amplitudes, TOP_FREQUENCIES)
+            results["fourier_freqs"] = {
+                "frequencies": frequencies[top].tolist(),
+                "amplitudes": amplitudes[top].tolist(),
+            }
+            results["seasonal_periods"] = get_seasonal_periods(
+                frequencies, amplitudes, n_obs
+            )
+        if smoothed is not None:
+            # moved into the float32 blob of the series when the result is stored
+            smoothed.flush()
+            results["smoothed_series_path"] = str(smoothed_path)
+        return results
+
+    except Exception as e:
+        if smoothed is not None:
+            Path(smoothed_path).unlink(missing_ok=True)
+        return {"error": f"An unexpected error occurred: {e}"}
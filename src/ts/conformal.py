@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+
+from ts.forecast import ForwardedModel
+
+INTERVAL_LEVEL = 0.9
+
+
+def conformal_quantile(scores: np.ndarray, level: float) -> float | None:
+    """
+    Квантиль split-conformal с поправкой на конечную выборку:
+    ceil((n + 1) * level)-я по величине оценка. None, если оценок мало.
+    """
+    rank = math.ceil((len(scores) + 1) * level)
+    if rank > len(scores):
+        return None
+    return float(np.sort(scores)[rank - 1])
+
+
+def conformal_intervals(
+    predictions: list[float],
+    errors: np.ndarray,
+    level: float = INTERVAL_LEVEL,
+) -> tuple[list[float], list[float], float]:
+    """
+    Интервалы прогноза по ошибкам отложенных окон (errors - окна x шаги).
+    Ширина на шаге k - конформный квантиль модулей ошибок на этом шаге;
+    если окон для этого мало, берутся ошибки всех шагов до k включительно,
+    а если мало и их - наибольшая ошибка, которая покрывает только долю
+    n / (n + 1). Возвращает границы и уровень, достигнутый на всех шагах.
+    """
+    scores = np.abs(np.asarray(errors, dtype=np.float64))
+    lower, upper = [], []
+    achieved = level
+    for k, predicted in enumerate(predictions):
+        step = min(k, scores.shape[1] - 1)
+        width = conformal_quantile(scores[:, step], level)
+        if width is None:
+            width = conformal_quantile(scores[:, : step + 1].ravel(), level)
+        if width is None:
+            pooled = scores[:, : step + 1].ravel()
+            width = float(pooled.max())
+            achieved = min(achieved, len(pooled) / (len(pooled) + 1))
+        lower.append(predicted - width)
+        upper.append(predicted + width)
+    return lower, upper, achieved
+
+
+def in_sample_residuals(model, series: list[float]) -> np.ndarray:
+    """
+    Остатки прогноза на шаг вперед обученной модели на ее обучающем ряде.
+    Модель, продолженная через forward, дает остатки на части ряда,
+    по которой подбирались ее параметры.
+    """
+    if isinstance(model, ForwardedModel):
+        model = model.model
+    fitted = np.asarray(model.predict_in_sample()["fitted"], dtype=np.float64)
+    residuals = np.asarray(series, dtype=np.float64)[: len(fitted)] - fitted
+    return residuals[np.isfinite(residuals)]
+
+
+def residual_intervals(
+    predictions: list[float],
+    residuals: np.ndarray,
+    level: float = INTERVAL_LEVEL,
+) -> tuple[list[float], list[float], None] | None:
+    """
+    Приближенные интервалы по остаткам на обучающем ряде: ширина на шаге k -
+    квантиль модулей остатков уровня level, умноженный на sqrt(k) (рост
+    ошибки как у случайного блуждания). Покрытие такого интервала не
+    гарантируется, поэтому уровень возвращается как None. None вместо
+    интервалов, если остатков мало для уровня level.
+    """
+    width = conformal_quantile(np.abs(residuals), level)
+    if width is None:
+        return None
+    widths = width * np.sqrt(np.arange(1, len(predictions) + 1))
+    predictions = np.asarray(predictions, dtype=np.float64)
+    return (predictions - widths).tolist(), (predictions + widths).tolist(), None
+
+
+def forecast_intervals(
+    model_name: str,
+    model,
+    series: list[float],
+    predictions: list[float],
+    calibration_errors: dict[str, list[list[float]]] | None = None,
+    level: float = INTERVAL_LEVEL,
+) -> tuple[list[float], list[float], float | None] | None:
+    """
+    Интервалы прогноза обученной модели без дополнительных обучений:
+    калибровка по сохраненным ошибкам бэктеста, а если их нет - по остаткам
+    модели на обучающем ряде. Возвращает границы и их фактический уровень
+    (None для приближенных интервалов по остаткам) или None, если
+    калибровать не на чем.
+    """
+    errors = (calibration_errors or {}).get(model_name)
+    if errors:
+        return conformal_intervals(predictions, errors, level)
+    return residual_intervals(predictions, in_sample_residuals(model, series), level)
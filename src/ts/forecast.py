@@ -1,6 +1,17 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
+import pandas as pd
+from scipy.signal import lfilter
+from statsforecast import StatsForecast
+from statsforecast.arima import ndiffs, nsdiffs
 from statsforecast.models import (
+    ARIMA,
     AutoARIMA,
     AutoETS,
     AutoTBATS,
@@ -8,20 +19,174 @@ from statsforecast.models import (
     HistoricAverage,
 )
 
+from ts.kernels import (
+    drift_predict,
+    linear_trend_fit,
+    linear_trend_predict,
+    seasonal_naive_predict,
+    ses_fit,
+    window_average_predict,
+)
+from ts.model_cache import (
+    load_fitted_model,
+    model_cache_key,
+    series_hash,
+    store_fitted_model,
+)
+
 
 class LinearTrendModel:
     def fit(self, y, X=None):
+        y = np.asarray(y, dtype=np.float64)
         self.n = len(y)
-        self.model = LinearRegression()
-        self.model.fit(np.arange(self.n).reshape(-1, 1), y)
+        slopes, intercepts = linear_trend_fit(y.reshape(1, -1))
+        self.slope, self.intercept = slopes[0], intercepts[0]
+        return self
+
+    def predict(self, h, X=None):
+        preds = linear_trend_predict(
+            np.array([self.slope]), np.array([self.intercept]), self.n, h
+        )
+        return {"mean": preds[0]}
+
+    def predict_in_sample(self):
+        return {"fitted": self.intercept + self.slope * np.arange(self.n)}
+
+    def update(self, y_new):
+        """
+        Дообучение на новых наблюдениях без прохода по старым: суммы МНК
+        восстанавливаются по наклону и свободному члену, к ним добавляются
+        новые точки. Результат совпадает с обучением на всем ряде.
+        """
+        y_new = np.asarray(y_new, dtype=np.float64)
+        n = self.n
+        sum_y = n * (self.intercept + self.slope * (n - 1) / 2)
+        sum_xy = self.slope * n * (n * n - 1) / 12 + (n - 1) / 2 * sum_y
+
+        sum_y += y_new.sum()
+        sum_xy += np.arange(n, n + len(y_new)) @ y_new
+        n += len(y_new)
+
+        x_mean = (n - 1) / 2
+        sxx = n * (n * n - 1) / 12
+        self.slope = (sum_xy - x_mean * sum_y) / sxx if sxx > 0 else 0.0
+        self.intercept = sum_y / n - self.slope * x_mean
+        self.n = n
+        return self
+
+    @staticmethod
+    def forecast_batch(y: np.ndarray, h: int) -> np.ndarray:
+        """
+        Прогноз сразу для 2D-массива рядов равной длины (ряд - строка).
+        """
+        slopes, intercepts = linear_trend_fit(y)
+        return linear_trend_predict(slopes, intercepts, y.shape[1], h)
+
+
+class SeasonalNaiveModel:
+    def __init__(self, season_length: int = 1):
+        self.season_length = season_length
+
+    def fit(self, y, X=None):
+        self.y = np.asarray(y, dtype=np.float64)
+        return self
+
+    def predict(self, h, X=None):
+        return {"mean": self.forecast_batch(self.y.reshape(1, -1), h)[0]}
+
+    def predict_in_sample(self):
+        season_length = min(self.season_length, len(self.y))
+        fitted = np.full(len(self.y), np.nan)
+        fitted[season_length:] = self.y[: len(self.y) - season_length]
+        return {"fitted": fitted}
+
+    def forecast_batch(self, y: np.ndarray, h: int) -> np.ndarray:
+        return seasonal_naive_predict(y, self.season_length, h)
+
+
+class DriftModel:
+    def fit(self, y, X=None):
+        self.y = np.asarray(y, dtype=np.float64)
+        return self
+
+    def predict(self, h, X=None):
+        return {"mean": self.forecast_batch(self.y.reshape(1, -1), h)[0]}
+
+    def predict_in_sample(self):
+        n = len(self.y)
+        drift = (self.y[-1] - self.y[0]) / (n - 1) if n > 1 else 0.0
+        return {"fitted": np.r_[np.nan, self.y[:-1] + drift]}
+
+    @staticmethod
+    def forecast_batch(y: np.ndarray, h: int) -> np.ndarray:
+        return drift_predict(y, h)
+
+
+class SimpleExponentialSmoothingModel:
+    # alpha is chosen per series from this grid by one-step-ahead SSE
+    ALPHAS = np.linspace(0.05, 1.0, 20)
+
+    def fit(self, y, X=None):
+        self.y = np.asarray(y, dtype=np.float64)
+        levels, alphas = ses_fit(self.y.reshape(1, -1), self.ALPHAS)
+        self.level, self.alpha = levels[0], alphas[0]
+        return self
+
+    def predict(self, h, X=None):
+        return {"mean": np.full(h, self.level)}
+
+    def predict_in_sample(self):
+        # the level before each observation is its one-step-ahead forecast
+        levels, _ = lfilter(
+            [self.alpha],
+            [1, self.alpha - 1],
+            self.y,
+            zi=[(1 - self.alpha) * self.y[0]],
+        )
+        return {"fitted": np.r_[np.nan, levels[:-1]]}
+
+    @classmethod
+    def forecast_batch(cls, y: np.ndarray, h: int) -> np.ndarray:
+        levels, _ = ses_fit(y, cls.ALPHAS)
+        return np.repeat(levels[:, None], h, axis=1)
+
+
+class WindowAverageModel:
+    def __init__(self, window_size: int = 10):
+        self.window_size = window_size
+
+    def fit(self, y, X=None):
+        self.y = np.asarray(y, dtype=np.float64)
         return self
 
     def predict(self, h, X=None):
-        future_idx = np.arange(self.n, self.n + h)
-        return {"mean": self.model.predict(future_idx.reshape(-1, 1))}
+        return {"mean": self.forecast_batch(self.y.reshape(1, -1), h)[0]}
 
+    def predict_in_sample(self):
+        w = self.window_size
+        sums = np.r_[0.0, np.cumsum(self.y)]
+        fitted = np.full(len(self.y), np.nan)
+        fitted[w:] = (sums[w:-1] - sums[: len(self.y) - w]) / w
+        return {"fitted": fitted}
 
-NAIVE_MODELS = {"Среднее значение": HistoricAverage, "Линейный тренд": LinearTrendModel}
+    def forecast_batch(self, y: np.ndarray, h: int) -> np.ndarray:
+        return window_average_predict(y, self.window_size, h)
+
+
+NAIVE_MODELS = {
+    "Среднее значение": HistoricAverage,
+    "Линейный тренд": LinearTrendModel,
+    "Сезонный наивный": SeasonalNaiveModel,
+    "Дрейф": DriftModel,
+    "Экспоненциальное сглаживание": SimpleExponentialSmoothingModel,
+    "Скользящее среднее": WindowAverageModel,
+}
+# models on batched Numba kernels, cheap enough to be computed inline
+FAST_MODELS = [
+    model_name
+    for model_name, model_class in NAIVE_MODELS.items()
+    if hasattr(model_class, "forecast_batch")
+]
 STATS_MODELS = {
     "ARIMA": AutoARIMA,
     "ETS": AutoETS,
@@ -31,23 +196,498 @@ STATS_MODELS = {
 ALL_MODELS = {**NAIVE_MODELS, **STATS_MODELS}
 
 
-def train_model(model_name: str, series: list[float]):
+# Максимальная длина сезона, с которой модель обучается за разумное время
+# (AutoETS в statsforecast не поддерживает сезоны длиннее 24)
+MAX_SEASON_LENGTH = {"ETS": 24, "ARIMA": 24, "Theta": 365}
+MAX_TBATS_SEASONS = 3
+# seasonal ARIMA search is kept to the smallest seasonal orders
+SEASONAL_ARIMA_PARAMS = {"start_P": 0, "start_Q": 0, "max_P": 1, "max_Q": 1}
+
+
+def get_season_lengths(analysis_results: dict, n_obs: int) -> list[int]:
+    """
+    Периоды сезонности (в отсчетах) из результатов анализа, от самого
+    сильного к самому слабому. Для результатов, сохраненных до появления
+    seasonal_periods, периоды берутся по доминирующим частотам Фурье.
+    Остаются только периоды, которые укладываются в ряд хотя бы дважды.
+    """
+    if not analysis_results:
+        return []
+    if "seasonal_periods" in analysis_results:
+        periods = analysis_results["seasonal_periods"]
+    else:
+        frequencies = analysis_results.get("fourier_freqs", {}).get("frequencies", [])
+        periods = [int(round(1 / freq)) for freq in frequencies if freq > 0]
+
+    season_lengths = []
+    for period in periods:
+        if 2 <= period <= n_obs // 2 and period not in season_lengths:
+            season_lengths.append(period)
+    return season_lengths
+
+
+def get_season_length(model_name: str, season_lengths: list[int] | None) -> int:
+    suitable = [p for p in season_lengths or [] if p <= MAX_SEASON_LENGTH[model_name]]
+    return suitable[0] if suitable else 1
+
+
+def build_model(model_name: str, season_lengths: list[int] | None = None, **params):
     if model_name not in ALL_MODELS:
         raise ValueError(f"Unknown model: {model_name}")
 
     model_class = ALL_MODELS[model_name]
-    if model_name == "tbats":
-        model = model_class(season_length=[7, 30, 120, 365])
-    else:
-        model = model_class()
+    season_lengths = season_lengths or []
+    if model_name == "TBATS":
+        return model_class(
+            season_length=season_lengths[:MAX_TBATS_SEASONS] or 1, **params
+        )
+    if model_name == "Сезонный наивный":
+        return model_class(season_length=season_lengths[0] if season_lengths else 1)
+    if model_name in MAX_SEASON_LENGTH:
+        season_length = get_season_length(model_name, season_lengths)
+        if model_name == "ARIMA" and season_length > 1:
+            return model_class(
+                season_length=season_length, **SEASONAL_ARIMA_PARAMS, **params
+            )
+        return model_class(season_length=season_length, **params)
+    return model_class()
+
+
+def model_spec(model_name: str, season_lengths: list[int] | None = None) -> str:
+    # identifies model configuration in the fitted models cache
+    return f"{model_name}__{list(season_lengths or [])}"
+
+
+def train_model(
+    model_name: str, series: list[float], season_lengths: list[int] | None = None
+):
+    model = build_model(model_name, season_lengths)
     model.fit(np.array(series))
 
     return model
 
 
+def get_fitted_model(
+    model_name: str,
+    series: list[float],
+    season_lengths: list[int] | None = None,
+    lineage: list[tuple[int, str]] | None = None,
+):
+    """
+    Возвращает обученную модель из кеша, обновленную новыми наблюдениями
+    модель предыдущей версии ряда или обучает и кеширует новую.
+    """
+    key = model_cache_key(model_spec(model_name, season_lengths), series)
+    model = load_fitted_model(key)
+    if model is None and lineage:
+        model = get_updated_model(model_name, series, season_lengths, lineage)
+        if model is not None:
+            logging.info(f"{model_name} updated with new observations")
+            store_fitted_model(key, model)
+    if model is None:
+        model = train_model(model_name, series, season_lengths)
+        store_fitted_model(key, model)
+    return model
+
+
+# Пороги, после которых вместо обновления модели новыми наблюдениями
+# выполняется полный подбор: ошибка прогноза на новых точках относительно
+# средней ошибки наивного прогноза на шаг вперед и прирост ряда с момента
+# последнего полного обучения
+INCREMENTAL_REFIT_ERROR = float(os.getenv("INCREMENTAL_REFIT_ERROR", 2.0))
+INCREMENTAL_MAX_GROWTH = float(os.getenv("INCREMENTAL_MAX_GROWTH", 0.5))
+
+
+class ForwardedModel:
+    """
+    Обученная модель statsforecast, примененная к продолженному ряду
+    без переобучения параметров (через forward).
+    """
+
+    def __init__(self, model, y, n_fit: int):
+        self.model = model
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n_fit = n_fit  # length of the series the parameters were fitted on
+
+    def predict(self, h, X=None):
+        return {"mean": self.model.forward(y=self.y, h=h)["mean"]}
+
+
+def update_fitted_model(model, series: list[float], n_prev: int):
+    """
+    Обновляет модель, обученную на series[:n_prev], новыми наблюдениями.
+    Возвращает None, если модель нельзя обновить или пройден порог
+    переобучения, и нужен полный подбор.
+    """
+    y = np.asarray(series, dtype=np.float64)
+    y_new = y[n_prev:]
+
+    base, n_fit = model, n_prev
+    if isinstance(model, ForwardedModel):
+        base, n_fit = model.model, model.n_fit
+    if not (isinstance(base, LinearTrendModel) or hasattr(base, "forward")):
+        return None
+
+    scale = np.mean(np.abs(np.diff(y[:n_prev]))) if n_prev > 1 else 0.0
+    error = np.mean(np.abs(y_new - np.asarray(forecast(model, len(y_new)))))
+    if scale > 0 and error / scale > INCREMENTAL_REFIT_ERROR:
+        logging.info(f"Forecast error on new observations is {error / scale:.2f}")
+        return None
+
+    if isinstance(base, LinearTrendModel):
+        # the update is exact, so the trend never needs a full refit
+        return base.update(y_new)
+    if (len(y) - n_fit) / n_fit > INCREMENTAL_MAX_GROWTH:
+        logging.info(f"Series grew from {n_fit} to {len(y)} since the last full fit")
+        return None
+    return ForwardedModel(base, y, n_fit)
+
+
+def get_updated_model(
+    model_name: str,
+    series: list[float],
+    season_lengths: list[int] | None,
+    lineage: list[tuple[int, str]],
+):
+    """
+    Ищет в кеше модель, обученную на последней предыдущей версии ряда
+    (lineage - пары длина/хеш прошлых версий), и обновляет ее новыми
+    наблюдениями. Возвращает None, если обновить нечего или нельзя.
+    """
+    spec = model_spec(model_name, season_lengths)
+    for length, prefix_hash in reversed(lineage):
+        prefix = series[:length]
+        if length >= len(series) or series_hash(prefix) != prefix_hash:
+            continue
+        model = load_fitted_model(model_cache_key(spec, prefix))
+        if model is not None:
+            return update_fitted_model(model, series, length)
+    return None
+
+
+# Доля бюджета времени на основную модель, остаток - на упрощенную ETS
+PRIMARY_BUDGET_SHARE = 0.8
+RESTRICTED_ETS_NAME = "ETS (без сезонности)"
+FINAL_FALLBACK_NAME = "Линейный тренд"
+
+
+def run_with_deadline(func, args: tuple, timeout: float):
+    """
+    Выполняет func(*args) в отдельном процессе. Если результат не получен
+    за timeout секунд, процесс убивается и бросается multiprocessing.TimeoutError.
+    """
+    with multiprocessing.Pool(processes=1) as pool:
+        return pool.apply_async(func, args).get(timeout=timeout)
+
+
+def train_restricted_ets(series: list[float]):
+    # non-seasonal ETS search over a handful of error/trend combinations
+    return AutoETS(model="ZZN").fit(np.array(series))
+
+
+def train_model_with_budget(
+    model_name: str,
+    series: list[float],
+    season_lengths: list[int] | None,
+    time_budget: float,
+    lineage: list[tuple[int, str]] | None = None,
+) -> tuple[object, str]:
+    """
+    "Anytime"-обучение: основная модель обучается с дедлайном, при его
+    превышении - упрощенная ETS на остаток бюджета, а если не успевает и она -
+    линейный тренд. Возвращает обученную модель и название фактически
+    использованной модели.
+    """
+    deadline = time.monotonic() + time_budget
+    try:
+        model = run_with_deadline(
+            get_fitted_model,
+            (model_name, series, season_lengths, lineage),
+            time_budget * PRIMARY_BUDGET_SHARE,
+        )
+        return model, model_name
+    except multiprocessing.TimeoutError:
+        logging.warning(f"{model_name} did not fit in {time_budget}s, falling back")
+
+    try:
+        model = run_with_deadline(
+            train_restricted_ets, (series,), max(deadline - time.monotonic(), 1)
+        )
+        return model, RESTRICTED_ETS_NAME
+    except multiprocessing.TimeoutError:
+        logging.warning(f"{RESTRICTED_ETS_NAME} did not fit in time, falling back")
+
+    return train_model(FINAL_FALLBACK_NAME, series), FINAL_FALLBACK_NAME
+
+
+# Верхняя граница числа процессов на одну задачу в параллельном режиме
+PARALLEL_FIT_MAX_WORKERS = int(
+    os.getenv("PARALLEL_FIT_MAX_WORKERS", os.cpu_count() or 1)
+)
+PARALLEL_MODELS = {"ARIMA", "ETS"}
+# candidate grid of the parallel ARIMA search: p + q <= max order, P + Q <= 1
+PARALLEL_ARIMA_MAX_ORDER = 3
+
+
+def get_arima_candidates(series: np.ndarray, season_length: int) -> list:
+    """
+    Полная сетка ARIMA-порядков при порядках разностей, выбранных тестами
+    (как в auto.arima), чтобы AICc кандидатов были сравнимы между собой.
+    """
+    D = nsdiffs(series, period=season_length) if season_length > 1 else 0
+    differenced = series
+    for _ in range(D):
+        differenced = differenced[season_length:] - differenced[:-season_length]
+    d = ndiffs(differenced)
+
+    seasonal_orders = [(0, D, 0)]
+    if season_length > 1:
+        seasonal_orders += [(1, D, 0), (0, D, 1)]
+    constants = [True, False] if d + D <= 1 else [False]
+
+    return [
+        ARIMA(
+            order=(p, d, q),
+            season_length=season_length,
+            seasonal_order=seasonal_order,
+            include_constant=constant,
+        )
+        for p in range(PARALLEL_ARIMA_MAX_ORDER + 1)
+        for q in range(PARALLEL_ARIMA_MAX_ORDER + 1 - p)
+        for seasonal_order in seasonal_orders
+        for constant in constants
+    ]
+
+
+def get_ets_candidates(series: np.ndarray, season_length: int) -> list:
+    # the same model space AutoETS searches: multiplicative components only
+    # for positive data and no additive error with multiplicative season
+    positive = bool(np.all(series > 0))
+    errors = ["A", "M"] if positive else ["A"]
+    trends = [("N", False), ("A", False), ("A", True)]
+    seasons = ["N"]
+    if season_length > 1:
+        seasons += ["A", "M"] if positive else ["A"]
+
+    return [
+        AutoETS(
+            model=f"{error}{trend}{season}",
+            damped=damped,
+            season_length=season_length if season != "N" else 1,
+        )
+        for error in errors
+        for trend, damped in trends
+        for season in seasons
+        if not (error == "A" and season == "M")
+    ]
+
+
+def _fit_candidate(model, series: np.ndarray):
+    return model.fit(series)
+
+
+def train_model_parallel(
+    model_name: str,
+    series: list[float],
+    season_lengths: list[int] | None = None,
+    time_budget: float | None = None,
+    max_workers: int | None = None,
+) -> tuple[object, str]:
+    """
+    Параллельный режим для одиночных интерактивных задач: кандидаты
+    ARIMA-порядков или ETS-конфигураций обучаются на пуле процессов,
+    выбирается кандидат с наименьшим AICc. По истечении time_budget
+    выбор делается среди уже обученных кандидатов.
+    Возвращает обученную модель и название фактически использованной модели.
+    """
+    if model_name not in PARALLEL_MODELS:
+        raise ValueError(f"Parallel fitting is not supported for model: {model_name}")
+
+    key = model_cache_key(
+        model_spec(f"{model_name} (parallel)", season_lengths), series
+    )
+    model = load_fitted_model(key)
+    if model is not None:
+        return model, model_name
+
+    y = np.asarray(series, dtype=np.float64)
+    season_length = get_season_length(model_name, season_lengths)
+    if model_name == "ARIMA":
+        candidates = get_arima_candidates(y, season_length)
+    else:
+        candidates = get_ets_candidates(y, season_length)
+
+    n_workers = min(
+        len(candidates), max_workers or PARALLEL_FIT_MAX_WORKERS, os.cpu_count() or 1
+    )
+    deadline = time.monotonic() + time_budget if time_budget else None
+    fitted = []
+    with multiprocessing.Pool(processes=n_workers) as pool:
+        results = [
+            pool.apply_async(_fit_candidate, (candidate, y)) for candidate in candidates
+        ]
+        for result in results:
+            timeout = max(deadline - time.monotonic(), 0) if deadline else None
+            try:
+                fitted.append(result.get(timeout=timeout))
+            except multiprocessing.TimeoutError:
+                continue
+            except Exception as e:
+                logging.warning(f"{model_name} candidate failed to fit: {e}")
+    # leaving the pool terminates candidates that are still fitting
+
+    fitted = [m for m in fitted if np.isfinite(m.model_["aicc"])]
+    logging.info(f"{len(fitted)} of {len(candidates)} {model_name} candidates fitted")
+    if not fitted:
+        return train_model(FINAL_FALLBACK_NAME, series), FINAL_FALLBACK_NAME
+
+    model = min(fitted, key=lambda m: m.model_["aicc"])
+    store_fitted_model(key, model)
+    return model, model_name
+
+
 def forecast(model, horizon: int):
-    if isinstance(model, tuple(ALL_MODELS.values())):
+    if isinstance(model, (*ALL_MODELS.values(), ARIMA, ForwardedModel)):
         preds = model.predict(h=horizon)["mean"]
         return preds if isinstance(preds, list) else preds.tolist()
     else:
         raise TypeError(f"Unknown model type: {type(model)}")
+
+
+def forecast_many(
+    requests: list[tuple[str, list[float], int, list[int] | None]],
+) -> list[list[float] | Exception]:
+    """
+    Пакетный прогноз по списку (модель, ряд, горизонт, периоды сезонности).
+    Ряды группируются по конфигурации модели, уже обученные модели берутся
+    из кеша, остальные обучаются одним вызовом StatsForecast на всех ядрах.
+    Группа, которую не удалось обучить, прогнозируется по одному ряду, и для
+    неудавшегося запроса вместо прогноза возвращается ошибка.
+    """
+    results = [None] * len(requests)
+    groups = defaultdict(list)
+    for i, (model_name, _, _, season_lengths) in enumerate(requests):
+        if model_name not in ALL_MODELS:
+            results[i] = ValueError(f"Unknown model: {model_name}")
+        else:
+            groups[(model_name, tuple(season_lengths or []))].append(i)
+
+    groups = list(groups.items())
+    while groups:
+        (model_name, season_lengths), indices = groups.pop()
+        try:
+            group_results = _forecast_group(
+                model_name, season_lengths, [requests[i] for i in indices]
+            )
+        except Exception as e:
+            if len(indices) > 1:
+                # the failing series is found by fitting the group one by one
+                groups += [((model_name, season_lengths), [i]) for i in indices]
+                continue
+            group_results = [e]
+        for i, forecast_results in zip(indices, group_results):
+            results[i] = forecast_results
+
+    return results
+
+
+def _forecast_group(
+    model_name: str,
+    season_lengths: tuple[int, ...],
+    requests: list[tuple[str, list[float], int, list[int] | None]],
+) -> list[list[float]]:
+    # forecasts of one model configuration, in the order of requests
+    results = [None] * len(requests)
+    model_class = ALL_MODELS[model_name]
+    if hasattr(model_class, "forecast_batch"):
+        # closed-form models are refitted in one vectorized call per series
+        # length, which is cheaper than going through the model cache
+        by_length = defaultdict(list)
+        for i, (_, series, _, _) in enumerate(requests):
+            by_length[len(series)].append(i)
+        model = build_model(model_name, list(season_lengths))
+        for same_length in by_length.values():
+            y = np.array([requests[i][1] for i in same_length], dtype=np.float64)
+            preds = model.forecast_batch(y, max(requests[i][2] for i in same_length))
+            for i, row in zip(same_length, preds):
+                results[i] = row[: requests[i][2]].tolist()
+        return results
+
+    spec = model_spec(model_name, season_lengths)
+    keys = [model_cache_key(spec, series) for _, series, _, _ in requests]
+
+    to_fit = []
+    for i, key in enumerate(keys):
+        model = load_fitted_model(key)
+        if model is None:
+            to_fit.append(i)
+        else:
+            results[i] = forecast(model, requests[i][2])
+    if not to_fit:
+        return results
+
+    fitted = fit_statsforecast(
+        model_name, [requests[i][1] for i in to_fit], list(season_lengths)
+    )
+
+    for i, model in zip(to_fit, fitted):
+        store_fitted_model(keys[i], model)
+        results[i] = forecast(model, requests[i][2])
+
+    return results
+
+
+def fit_statsforecast(
+    model_name: str,
+    series_list: list[list[float]],
+    season_lengths: list[int] | None = None,
+) -> list:
+    """
+    Обучает одну модель на нескольких рядах одним вызовом StatsForecast.
+    Возвращает обученные модели в порядке series_list.
+    """
+    lengths = [len(series) for series in series_list]
+    df = pd.DataFrame(
+        {
+            "unique_id": np.repeat(np.arange(len(series_list)), lengths),
+            "ds": np.concatenate([np.arange(n) for n in lengths]),
+            "y": np.concatenate([np.asarray(s, dtype=float) for s in series_list]),
+        }
+    )
+    model = build_model(model_name, season_lengths)
+    sf = StatsForecast(models=[model], freq=1, n_jobs=-1)
+    sf.fit(df=df)
+    return list(sf.fitted_[:, 0])
+
+
+def forecast_models(
+    series: list[float],
+    model_names: list[str],
+    horizons: list[int],
+    season_lengths: list[int] | None = None,
+) -> dict[str, dict[int, list[float]] | Exception]:
+    """
+    Обучает несколько моделей на одном ряде параллельно (по процессу на модель)
+    и строит прогнозы на несколько горизонтов по каждой обученной модели.
+    Для модели, которую не удалось обучить, вместо прогнозов возвращается ошибка.
+    """
+    max_horizon = max(horizons)
+    results = {}
+    n_workers = min(len(model_names), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {
+            model_name: executor.submit(
+                get_fitted_model, model_name, series, season_lengths
+            )
+            for model_name in model_names
+        }
+        for model_name, future in futures.items():
+            try:
+                preds = forecast(future.result(), max_horizon)
+            except Exception as e:
+                results[model_name] = e
+                continue
+            # shorter horizons are prefixes of the longest forecast
+            results[model_name] = {fh: preds[:fh] for fh in horizons}
+
+    return results
@@ -0,0 +1,389 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True, parallel=True)
+def linear_trend_fit(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    МНК-прямая по индексу 0..n-1 для каждой строки 2D-массива рядов равной длины.
+    Возвращает массивы наклонов и свободных членов.
+    """
+    n_series, n = y.shape
+    x_mean = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12  # sum of (x - x_mean)^2 over 0..n-1
+
+    slopes = np.zeros(n_series)
+    intercepts = np.zeros(n_series)
+    for i in prange(n_series):
+        # one pass of running sums: sum of (x - x_mean) is zero, so
+        # sum of (x - x_mean) * y equals the centered cross product
+        sum_y = 0.0
+        sxy = 0.0
+        for j in range(n):
+            sum_y += y[i, j]
+            sxy += (j - x_mean) * y[i, j]
+
+        slope = sxy / sxx if sxx > 0 else 0.0
+        slopes[i] = slope
+        intercepts[i] = sum_y / n - slope * x_mean
+
+    return slopes, intercepts
+
+
+@njit(cache=True, parallel=True)
+def detrend(y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Остатки от МНК-прямой для каждой строки 2D-массива рядов.
+    Возвращает наклоны, свободные члены и остатки.
+    """
+    slopes, intercepts = linear_trend_fit(y)
+    residuals = np.empty_like(y)
+    for i in prange(y.shape[0]):
+        for j in range(y.shape[1]):
+            residuals[i, j] = y[i, j] - (intercepts[i] + slopes[i] * j)
+    return slopes, intercepts, residuals
+
+
+@njit(cache=True, parallel=True)
+def linear_trend_predict(
+    slopes: np.ndarray, intercepts: np.ndarray, start: int, h: int
+) -> np.ndarray:
+    out = np.empty((slopes.shape[0], h))
+    for i in prange(slopes.shape[0]):
+        for k in range(h):
+            out[i, k] = intercepts[i] + slopes[i] * (start + k)
+    return out
+
+
+@njit(cache=True, parallel=True)
+def seasonal_naive_predict(y: np.ndarray, season_length: int, h: int) -> np.ndarray:
+    """
+    Повторяет последний сезон каждого ряда.
+    """
+    n_series, n = y.shape
+    m = min(max(season_length, 1), n)
+    out = np.empty((n_series, h))
+    for i in prange(n_series):
+        for k in range(h):
+            out[i, k] = y[i, n - m + k % m]
+    return out
+
+
+@njit(cache=True, parallel=True)
+def drift_predict(y: np.ndarray, h: int) -> np.ndarray:
+    """
+    Продолжает прямую через первое и последнее наблюдения ряда.
+    """
+    n_series, n = y.shape
+    out = np.empty((n_series, h))
+    for i in prange(n_series):
+        slope = (y[i, n - 1] - y[i, 0]) / (n - 1) if n > 1 else 0.0
+        for k in range(h):
+            out[i, k] = y[i, n - 1] + slope * (k + 1)
+    return out
+
+
+@njit(cache=True, parallel=True)
+def ses_fit(y: np.ndarray, alphas: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Простое экспоненциальное сглаживание: для каждого ряда выбирается alpha
+    из сетки с минимальной суммой квадратов ошибок прогноза на шаг вперед.
+    Возвращает последние уровни и выбранные alpha.
+    """
+    n_series, n = y.shape
+    levels = np.empty(n_series)
+    best_alphas = np.empty(n_series)
+    for i in prange(n_series):
+        best_sse = np.inf
+        for k in range(len(alphas)):
+            alpha = alphas[k]
+            level = y[i, 0]
+            sse = 0.0
+            for j in range(1, n):
+                error = y[i, j] - level
+                sse += error * error
+                level += alpha * error
+            # the first candidate is always taken, so a NaN or infinite SSE
+            # (non-finite values in the series) never leaves the outputs unset
+            if k == 0 or sse < best_sse:
+                best_sse = sse
+                levels[i] = level
+                best_alphas[i] = alpha
+    return levels, best_alphas
+
+
+@njit(cache=True, parallel=True)
+def window_average_predict(y: np.ndarray, window_size: int, h: int) -> np.ndarray:
+    n_series, n = y.shape
+    w = min(max(window_size, 1), n)
+    out = np.empty((n_series, h))
+    for i in prange(n_series):
+        mean = 0.0
+        for j in range(n - w, n):
+            mean += y[i, j]
+        mean /= w
+        for k in range(h):
+            out[i, k] = mean
+    return out
+
+
+@njit(cache=True)
+def _sorted_quantile(s: np.ndarray, q: float) -> float:
+    # linear interpolation between order statistics, as in pandas/numpy
+    position = q * (len(s) - 1)
+    lo = int(np.floor(position))
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (position - lo)
+
+
+@njit(cache=True)
+def describe_sorted(s: np.ndarray, k: int):
+    """
+    Описательные статистики за один проход по отсортированному ряду: среднее,
+    std (ddof=1), min, квартили, max, а также k самых частых и k самых редких
+    значений с частотами (по сериям равных значений; при равных частотах
+    выше стоит меньшее значение).
+    """
+    n = len(s)
+
+    total = 0.0
+    for i in range(n):
+        total += s[i]
+    mean = total / n
+    squares = 0.0
+    for i in range(n):
+        squares += (s[i] - mean) ** 2
+    std = np.sqrt(squares / (n - 1)) if n > 1 else np.nan
+
+    top_values = np.empty(k)
+    top_counts = np.zeros(k, dtype=np.int64)
+    bottom_values = np.empty(k)
+    bottom_counts = np.zeros(k, dtype=np.int64)
+    n_top = 0
+    n_bottom = 0
+
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and s[j] == s[i]:
+            j += 1
+        count = j - i
+
+        if n_top < k or count > top_counts[n_top - 1]:
+            p = n_top if n_top < k else k - 1
+            while p > 0 and top_counts[p - 1] < count:
+                top_values[p] = top_values[p - 1]
+                top_counts[p] = top_counts[p - 1]
+                p -= 1
+            top_values[p] = s[i]
+            top_counts[p] = count
+            n_top = min(n_top + 1, k)
+
+        if n_bottom < k or count < bottom_counts[n_bottom - 1]:
+            p = n_bottom if n_bottom < k else k - 1
+            while p > 0 and bottom_counts[p - 1] > count:
+                bottom_values[p] = bottom_values[p - 1]
+                bottom_counts[p] = bottom_counts[p - 1]
+                p -= 1
+            bottom_values[p] = s[i]
+            bottom_counts[p] = count
+            n_bottom = min(n_bottom + 1, k)
+
+        i = j
+
+    return (
+        mean,
+        std,
+        s[0],
+        _sorted_quantile(s, 0.25),
+        _sorted_quantile(s, 0.5),
+        _sorted_quantile(s, 0.75),
+        s[n - 1],
+        top_values[:n_top],
+        top_counts[:n_top],
+        bottom_values[:n_bottom],
+        bottom_counts[:n_bottom],
+    )
+
+
+@njit(cache=True, parallel=True)
+def sort_count_inversions(x: np.ndarray) -> tuple[np.ndarray, int]:
+    """
+    Сортировка слиянием снизу вверх с подсчетом инверсий (пар i < j,
+    x[i] > x[j]; равные значения инверсией не считаются) за O(n log n).
+    Пары блоков на каждом проходе сливаются параллельно.
+    Возвращает отсортированный массив и число инверсий.
+    """
+    n = len(x)
+    a = x.copy()
+    buf = np.empty_like(a)
+    inversions = 0
+    width = 1
+    while width < n:
+        n_blocks = (n + 2 * width - 1) // (2 * width)
+        for block in prange(n_blocks):
+            lo = block * 2 * width
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            i, j, k = lo, mid, lo
+            block_inversions = 0
+            while i < mid and j < hi:
+                # branchless merge step: data-dependent branches mispredict
+                # on unsorted data and dominate the run time
+                left = a[i]
+                right = a[j]
+                take_right = right < left
+                buf[k] = right if take_right else left
+                # right is smaller than every element left in the left half
+                block_inversions += take_right * (mid - i)
+                j += take_right
+                i += 1 - take_right
+                k += 1
+            while i < mid:
+                buf[k] = a[i]
+                i += 1
+                k += 1
+            while j < hi:
+                buf[k] = a[j]
+                j += 1
+                k += 1
+            inversions += block_inversions
+        a, buf = buf, a
+        width *= 2
+    return a, inversions
+
+
+@njit(cache=True, parallel=True)
+def arch_lm(residuals: np.ndarray, nlags: int) -> np.ndarray:
+    """
+    Статистика LM теста ARCH (Энгла) для каждой строки 2D-массива остатков:
+    nobs * R^2 регрессии квадрата остатка на константу и nlags его лагов.
+    Вместо матрицы лагов нормальные уравнения собираются из центрированных
+    сумм произведений квадратов остатков со сдвигами.
+    """
+    n_series, n = residuals.shape
+    nobs = n - nlags
+    lm = np.empty(n_series)
+    for i in prange(n_series):
+        z = residuals[i] ** 2
+
+        # means of the target (column 0) and of every lag over the used rows
+        means = np.zeros(nlags + 1)
+        for j in range(nlags + 1):
+            for t in range(nlags, n):
+                means[j] += z[t - j]
+            means[j] /= nobs
+
+        cov = np.zeros((nlags + 1, nlags + 1))
+        for j in range(nlags + 1):
+            for k in range(j, nlags + 1):
+                total = 0.0
+                for t in range(nlags, n):
+                    total += (z[t - j] - means[j]) * (z[t - k] - means[k])
+                cov[j, k] = total
+                cov[k, j] = total
+
+        syy = cov[0, 0]
+        if syy <= 0:
+            lm[i] = 0.0
+            continue
+        sxy = cov[1:, 0].copy()
+        beta = np.linalg.pinv(cov[1:, 1:]) @ sxy
+        lm[i] = nobs * (sxy @ beta) / syy
+    return lm
+
+
+@njit(cache=True)
+def bucket_lttb(
+    y: np.ndarray, size: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Минимум, максимум и среднее по корзинам [k*size, (k+1)*size) ряда и
+    представитель каждой корзины по LTTB (Largest-Triangle-Three-Buckets):
+    точка корзины с наибольшей площадью треугольника с предыдущим выбранным
+    представителем и средней точкой следующей корзины.
+    Возвращает массивы минимумов, максимумов, средних и индексов представителей.
+    """
+    n = len(y)
+    n_buckets = (n + size - 1) // size
+    mins = np.empty(n_buckets)
+    maxs = np.empty(n_buckets)
+    means = np.empty(n_buckets)
+    for k in range(n_buckets):
+        lo = k * size
+        hi = min(lo + size, n)
+        low = y[lo]
+        high = y[lo]
+        total = 0.0
+        for j in range(lo, hi):
+            low = min(low, y[j])
+            high = max(high, y[j])
+            total += y[j]
+        mins[k] = low
+        maxs[k] = high
+        means[k] = total / (hi - lo)
+
+    representatives = np.empty(n_buckets, dtype=np.int64)
+    # the first point anchors the first triangle, as in the classic LTTB
+    prev_x = 0.0
+    prev_y = y[0]
+    for k in range(n_buckets):
+        lo = k * size
+        hi = min(lo + size, n)
+        if k + 1 < n_buckets:
+            next_x = (hi + min(hi + size, n) - 1) / 2
+            next_y = means[k + 1]
+        else:
+            next_x = n - 1.0
+            next_y = y[n - 1]
+
+        best = lo
+        best_area = -1.0
+        for j in range(lo, hi):
+            area = abs(
+                (prev_x - next_x) * (y[j] - prev_y) - (prev_x - j) * (next_y - prev_y)
+            )
+            if area > best_area:
+                best_area = area
+                best = j
+        representatives[k] = best
+        prev_x = best
+        prev_y = y[best]
+
+    return mins, maxs, means, representatives
+
+
+@njit(cache=True)
+def lttb_select(
+    x: np.ndarray,
+    y: np.ndarray,
+    starts: np.ndarray,
+    next_x: np.ndarray,
+    next_y: np.ndarray,
+    prev_x: float,
+    prev_y: float,
+) -> np.ndarray:
+    """
+    Представители LTTB подряд идущих корзин точек (x, y), корзина k -
+    [starts[k], starts[k + 1]), с точками (next_x[k], next_y[k]) следующих
+    корзин и представителем (prev_x, prev_y) корзины перед первой.
+    Возвращает номера выбранных точек.
+    """
+    n_buckets = len(starts)
+    representatives = np.empty(n_buckets, dtype=np.int64)
+    for k in range(n_buckets):
+        hi = starts[k + 1] if k + 1 < n_buckets else len(x)
+        best = starts[k]
+        best_area = -1.0
+        for j in range(starts[k], hi):
+            area = abs(
+                (prev_x - next_x[k]) * (y[j] - prev_y)
+                - (prev_x - x[j]) * (next_y[k] - prev_y)
+            )
+            if area > best_area:
+                best_area = area
+                best = j
+        representatives[k] = best
+        prev_x = x[best]
+        prev_y = y[best]
+    return representatives
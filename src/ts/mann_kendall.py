@@ -0,0 +1,54 @@
+import numpy as np
+from scipy.stats import norm
+
+from ts.kernels import sort_count_inversions
+
+
+def mann_kendall_test(x, alpha: float = 0.05) -> dict:
+    """
+    Тест Манна-Кендалла на монотонный тренд за O(n log n) (алгоритм Найта):
+    S = P - Q, где Q - число инверсий (сортировка слиянием), а P получается
+    из общего числа пар за вычетом пар с равными значениями. Дисперсия S
+    с поправкой на связки и p-значение считаются так же, как в
+    pymannkendall.original_test (без оценки наклона Сена, она O(n^2)).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    n = len(x)
+
+    sorted_x, inversions = sort_count_inversions(x)
+    # sizes of groups of equal values
+    boundaries = np.flatnonzero(np.diff(sorted_x) != 0) + 1
+    ties = np.diff(np.concatenate(([0], boundaries, [n]))).astype(np.float64)
+
+    n_pairs = n * (n - 1) / 2
+    s = n_pairs - np.sum(ties * (ties - 1) / 2) - 2 * inversions
+    var_s = (
+        n * (n - 1) * (2 * n + 5) - np.sum(ties * (ties - 1) * (2 * ties + 5))
+    ) / 18
+
+    if s > 0:
+        z = (s - 1) / np.sqrt(var_s)
+    elif s < 0:
+        z = (s + 1) / np.sqrt(var_s)
+    else:
+        z = 0.0
+    p = 2 * (1 - norm.cdf(abs(z)))
+    h = abs(z) > norm.ppf(1 - alpha / 2)
+
+    if z < 0 and h:
+        trend = "decreasing"
+    elif z > 0 and h:
+        trend = "increasing"
+    else:
+        trend = "no trend"
+
+    return {
+        "trend": trend,
+        "h": bool(h),
+        "p": float(p),
+        "z": float(z),
+        "tau": float(s / n_pairs),
+        "s": float(s),
+        "var_s": float(var_s),
+    }
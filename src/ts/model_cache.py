@@ -0,0 +1,108 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", ".model_cache"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# eviction frees space down to this share of the limit, so the directory
+# is scanned once per that much of new models rather than on every write
+MODEL_CACHE_EVICT_TO = 0.9
+# bump when pickled model classes change, so stale entries are never loaded
+MODEL_CACHE_VERSION = 3
+
+
+def series_hash(series) -> str:
+    """
+    Хеш содержимого ряда (байты float64), не зависящий от его id и названия.
+    """
+    return hashlib.sha256(np.asarray(series, dtype=np.float64).tobytes()).hexdigest()
+
+
+def model_cache_key(model_name: str, series) -> str:
+    # model names may contain spaces and cyrillic, so hash them for the filename
+    key = f"{MODEL_CACHE_VERSION}__{series_hash(series)}__{model_name}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache_path(key: str) -> Path:
+    return MODEL_CACHE_DIR / f"{key}.pkl"
+
+
+def load_fitted_model(key: str):
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+    # mtime is used as the last access time for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return model
+
+
+# size of the cache directory: scanned once per process, then updated by own
+# writes; writes of other workers are counted at the next eviction scan
+_cache_bytes: int | None = None
+
+
+def store_fitted_model(key: str, model):
+    global _cache_bytes
+    MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _cache_path(key)
+    try:
+        replaced_size = path.stat().st_size
+    except OSError:
+        replaced_size = 0
+
+    # write to a temporary file first, so concurrent workers never read a partial pickle
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    size = tmp_path.stat().st_size
+    os.replace(tmp_path, path)
+
+    if _cache_bytes is None:
+        _cache_bytes = sum(size for _, size, _ in _cache_entries())
+    else:
+        _cache_bytes += size - replaced_size
+    # the directory is scanned only when a write pushes the total over the limit
+    if _cache_bytes > MODEL_CACHE_MAX_BYTES:
+        _cache_bytes = evict_fitted_models(
+            int(MODEL_CACHE_MAX_BYTES * MODEL_CACHE_EVICT_TO)
+        )
+
+
+def _cache_entries() -> list[tuple[float, int, Path]]:
+    entries = []
+    for path in MODEL_CACHE_DIR.glob("*.pkl"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def evict_fitted_models(max_bytes: int = MODEL_CACHE_MAX_BYTES) -> int:
+    """
+    Удаляет давно не использованные модели, пока кеш больше max_bytes.
+    Возвращает размер кеша после удаления.
+    """
+    entries = _cache_entries()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+    return total
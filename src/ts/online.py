@@ -0,0 +1,341 @@
+import heapq
+
+import numpy as np
+from scipy.signal import lfilter
+
+from ts.analyze import ANALYSIS_SECTIONS, EWM_SPAN, FREQUENT_VALUES_COUNT
+
+# larger compression keeps more centroids and gives more accurate quantiles
+TDIGEST_COMPRESSION = 200
+# exact value counts are kept up to this many distinct values, then only
+# this many most frequent ones, so the state of float data stays bounded
+COUNTS_LIMIT = 1000
+
+
+def empty_state(count_values: bool = True) -> dict:
+    """
+    Состояние онлайн-анализа ряда (JSON-совместимое): счетчик и Уэлфорд для
+    среднего и дисперсии, min/max, t-digest для квантилей, точные частоты
+    значений, суммы для линейного тренда и последнее значение EWM.
+    Частоты точны, пока различных значений не больше COUNTS_LIMIT, затем
+    хранятся только COUNTS_LIMIT самых частых (counts_capped): самые частые
+    значения становятся приближенными, а самые редкие не считаются.
+    Для анализа в ограниченной памяти частоты можно отключить
+    (count_values=False).
+    """
+    return {
+        "n": 0,
+        "mean": 0.0,
+        "m2": 0.0,
+        "min": None,
+        "max": None,
+        "first": None,
+        "ewm": None,
+        "sum_y": 0.0,
+        "sum_ty": 0.0,
+        "counts": {} if count_values else None,
+        "counts_capped": False,
+        "top": [],
+        "bottom": [],
+        "digest": {"means": [], "weights": []},
+    }
+
+
+def value_key(value: float) -> str:
+    # repr of a float round-trips exactly and matches JSON keys of the results
+    return repr(float(value))
+
+
+def _ewm_alpha() -> float:
+    return 2 / (EWM_SPAN + 1)
+
+
+def ewm_extend(last: float | None, values: np.ndarray) -> np.ndarray:
+    """
+    Значения EWM (span=EWM_SPAN, adjust=False) для новых точек,
+    продолжающие сглаживание с последнего значения last.
+    """
+    alpha = _ewm_alpha()
+    if last is None:
+        # pandas starts the recursion from the first observation
+        last = values[0]
+    smoothed, _ = lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * last])
+    return smoothed
+
+
+def _frequency_order(counts: dict, keys, most: bool) -> list[str]:
+    # ties go to the smaller value, as in describe_sorted
+    if most:
+        return heapq.nsmallest(
+            FREQUENT_VALUES_COUNT, keys, key=lambda k: (-counts[k], float(k))
+        )
+    return heapq.nsmallest(
+        FREQUENT_VALUES_COUNT, keys, key=lambda k: (counts[k], float(k))
+    )
+
+
+def _compress(means: np.ndarray, weights: np.ndarray) -> dict:
+    """
+    Сжатие центроидов t-digest: после сортировки соседние центроиды, чьи
+    квантили попадают в один шаг масштабной функции k1, объединяются.
+    Хвосты остаются подробными, середина - крупными центроидами.
+    """
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    q = (np.cumsum(weights) - weights / 2) / total
+    scale = TDIGEST_COMPRESSION / (2 * np.pi) * np.arcsin(2 * q - 1)
+    groups = np.floor(scale)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return {"means": merged_means.tolist(), "weights": merged_weights.tolist()}
+
+
+def state_quantile(state: dict, q: float) -> float:
+    """
+    Квантиль с линейной интерполяцией, как в pandas. При небольшом числе
+    различных значений он считается точно по частотам, иначе - по центрам
+    центроидов t-digest (одиночные центроиды дают точный ответ).
+    """
+    rank = q * (state["n"] - 1)
+    counts = state["counts"]
+    exact = counts is not None and not state.get("counts_capped", False)
+    if exact and len(counts) <= TDIGEST_COMPRESSION:
+        values = np.array(sorted(map(float, counts)))
+        ends = np.cumsum([counts[value_key(value)] for value in values])
+        lower = values[np.searchsorted(ends, np.floor(rank), side="right")]
+        upper = values[np.searchsorted(ends, np.ceil(rank), side="right")]
+        return float(lower + (upper - lower) * (rank - np.floor(rank)))
+
+    means = np.asarray(state["digest"]["means"])
+    weights = np.asarray(state["digest"]["weights"])
+    centers = np.cumsum(weights) - weights / 2
+    return float(
+        np.interp(
+            rank + 0.5,
+            np.r_[0.5, centers, state["n"] - 0.5],
+            np.r_[state["min"], means, state["max"]],
+        )
+    )
+
+
+def update_state(state: dict, values: list[float] | np.ndarray) -> dict:
+    """
+    Новое состояние после добавления точек в конец ряда за O(k) от их числа.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return merge_states(state, _chunk_state(values, state["counts"] is not None))
+
+
+def build_state(values: list[float] | np.ndarray, count_values: bool = True) -> dict:
+    return update_state(empty_state(count_values), values)
+
+
+def _chunk_state(values: np.ndarray, count_values: bool = True) -> dict:
+    k = len(values)
+    if k == 0:
+        return empty_state(count_values)
+    mean = float(values.mean())
+    chunk = {
+        "n": k,
+        "mean": mean,
+        "m2": float(((values - mean) ** 2).sum()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "first": float(values[0]),
+        "ewm": float(ewm_extend(None, values)[-1]),
+        "sum_y": float(values.sum()),
+        "sum_ty": float(np.arange(k) @ values),
+        "counts": None,
+        "counts_capped": False,
+        "top": [],
+        "bottom": [],
+        "digest": _compress(values, np.ones(k)),
+    }
+    if not count_values:
+        return chunk
+
+    unique, unique_counts = np.unique(values, return_counts=True)
+    # unique values are sorted, so a stable sort by count breaks ties as needed
+    order = np.argsort(-unique_counts, kind="stable")
+    if len(unique) > COUNTS_LIMIT:
+        order = order[:COUNTS_LIMIT]
+        chunk["counts_capped"] = True
+    else:
+        bottom = np.argsort(unique_counts, kind="stable")[:FREQUENT_VALUES_COUNT]
+        chunk["bottom"] = [value_key(value) for value in unique[bottom]]
+    # tolist gives python floats, so this is value_key without a call per value
+    keys = list(map(repr, unique[order].tolist()))
+    chunk["counts"] = dict(zip(keys, unique_counts[order].tolist()))
+    chunk["top"] = keys[:FREQUENT_VALUES_COUNT]
+    return chunk
+
+
+def _cap_counts(counts: dict) -> dict:
+    # ties go to the smaller value, as in _frequency_order
+    return dict(
+        heapq.nsmallest(
+            COUNTS_LIMIT, counts.items(), key=lambda item: (-item[1], float(item[0]))
+        )
+    )
+
+
+def _merge_counts(left: dict, right: dict) -> tuple[dict | None, list, list, bool]:
+    if left["counts"] is None or right["counts"] is None:
+        return None, [], [], False
+
+    right_keys = list(right["counts"])
+    bottom_grew = any(key in right["counts"] for key in left["bottom"])
+
+    counts, smaller = left["counts"], right["counts"]
+    if len(counts) < len(smaller):
+        counts, smaller = smaller, counts
+    for key, count in smaller.items():
+        counts[key] = counts.get(key, 0) + count
+
+    # counts only grow, so values outside the old top and outside the right
+    # part cannot enter the top; the bottom is exact unless a value of the
+    # old bottom grew, then it is recomputed over all values
+    top = _frequency_order(counts, {*left["top"], *right_keys}, most=True)
+
+    capped = left.get("counts_capped", False) or right.get("counts_capped", False)
+    if capped or len(counts) > COUNTS_LIMIT:
+        # values dropped from a capped counter lose their counts, so the
+        # least frequent values are unknown from here on
+        return _cap_counts(counts), top, [], True
+
+    if bottom_grew:
+        bottom = _frequency_order(counts, counts, most=False)
+    else:
+        bottom = _frequency_order(counts, {*left["bottom"], *right_keys}, most=False)
+    return counts, top, bottom, False
+
+
+def merge_states(left: dict, right: dict) -> dict:
+    """
+    Состояние ряда, составленного из ряда left и следующего за ним right
+    (например, соседних кусков, проанализированных параллельно).
+    Частоты сливаются за O(числа различных значений в меньшем из состояний),
+    счетчик большего из них при этом изменяется на месте.
+    """
+    if right["n"] == 0:
+        return left
+    if left["n"] == 0:
+        return right
+
+    n_left, n_right = left["n"], right["n"]
+    n = n_left + n_right
+    delta = right["mean"] - left["mean"]
+
+    # the right EWM started from its own first value instead of left["ewm"],
+    # the difference decays geometrically along the right part
+    decay = (1 - _ewm_alpha()) ** n_right
+    ewm = right["ewm"] + decay * (left["ewm"] - right["first"])
+
+    counts, top, bottom, counts_capped = _merge_counts(left, right)
+
+    digest = _compress(
+        np.r_[left["digest"]["means"], right["digest"]["means"]],
+        np.r_[left["digest"]["weights"], right["digest"]["weights"]],
+    )
+
+    return {
+        "n": n,
+        "mean": left["mean"] + delta * n_right / n,
+        "m2": left["m2"] + right["m2"] + delta**2 * n_left * n_right / n,
+        "min": min(left["min"], right["min"]),
+        "max": max(left["max"], right["max"]),
+        "first": left["first"],
+        "ewm": ewm,
+        "sum_y": left["sum_y"] + right["sum_y"],
+        # time indices of the right part are shifted by the left length
+        "sum_ty": left["sum_ty"] + right["sum_ty"] + n_left * right["sum_y"],
+        "counts": counts,
+        "counts_capped": counts_capped,
+        "top": top,
+        "bottom": bottom,
+        "digest": digest,
+    }
+
+
+def get_trend(state: dict) -> tuple[float, float]:
+    """
+    Наклон и свободный член МНК-прямой по индексам 0..n-1 из накопленных сумм.
+    """
+    n = state["n"]
+    t_mean = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12
+    slope = (state["sum_ty"] - t_mean * state["sum_y"]) / sxx if sxx > 0 else 0.0
+    return slope, state["sum_y"] / n - slope * t_mean
+
+
+def get_online_stats(state: dict) -> dict:
+    """
+    Простые статистики в формате get_simple_stats (квартили - по t-digest).
+    При урезанных частотах самые частые значения приближенные (их частоты
+    не больше истинных), а самых редких нет.
+    """
+    counts = state["counts"]
+    n = state["n"]
+    stats = {
+        "mean": state["mean"],
+        "median": state_quantile(state, 0.5),
+        "std": float(np.sqrt(state["m2"] / (n - 1))) if n > 1 else float("nan"),
+        "q25": state_quantile(state, 0.25),
+        "q75": state_quantile(state, 0.75),
+        "min": state["min"],
+        "max": state["max"],
+    }
+    if counts is not None:
+        stats["most_frequent"] = {float(key): counts[key] for key in state["top"]}
+        if not state.get("counts_capped", False):
+            stats["least_frequent"] = {
+                float(key): counts[key] for key in state["bottom"]
+            }
+    return stats
+
+
+# results of the tests and frequency sections need the whole series at once
+WHOLE_SERIES_KEYS = [
+    "trend_test_result",
+    "trend_test_p_value",
+    "arch_test_stat",
+    "arch_test_p_value",
+    "fourier_freqs",
+    "seasonal_periods",
+]
+FREQUENCY_STATS_KEYS = ["most_frequent", "least_frequent"]
+
+
+def append_to_analysis(
+    results: dict, state: dict, values: list[float]
+) -> tuple[dict, dict, np.ndarray]:
+    """
+    Результаты анализа и состояние после добавления точек в конец ряда за O(k):
+    статистики и тренд пересчитываются по состоянию, а сглаженный ряд
+    продолжается значениями EWM новых точек (они возвращаются третьими).
+    Тесты и частотный анализ требуют всего ряда: их результаты удаляются,
+    и обе секции убираются из списка посчитанных.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    smoothed = ewm_extend(state["ewm"], values)
+    state = update_state(state, values)
+    if not results or "error" in results:
+        return results, state, smoothed
+
+    sections = results.get("sections", list(ANALYSIS_SECTIONS))
+    results = {
+        key: value for key, value in results.items() if key not in WHOLE_SERIES_KEYS
+    }
+    if "stats" in sections:
+        stats = get_online_stats(state)
+        for key in FREQUENCY_STATS_KEYS:
+            if key not in stats:
+                # value counts were capped, old values would be stale
+                results.pop(key, None)
+        results.update(stats)
+    if "trend_slope" in results:
+        results["trend_slope"], results["trend_intercept"] = get_trend(state)
+    results["sections"] = [s for s in sections if s not in ["tests", "frequency"]]
+    return results, state, smoothed
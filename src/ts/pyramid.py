@@ -0,0 +1,176 @@
+import math
+
+import numpy as np
+
+from ts.kernels import bucket_lttb, lttb_select
+
+# every pyramid level has buckets PYRAMID_FACTOR times larger than the previous
+PYRAMID_FACTOR = 4
+VIEW_MAX_POINTS = 2000
+
+# per-bucket columns of a pyramid level and their dtypes; the raw level
+# (bucket size 1) keeps only the series itself in lttb_values
+LEVEL_COLUMNS = {
+    "lttb_index": np.int64,
+    "lttb_values": np.float64,
+    "min_values": np.float32,
+    "max_values": np.float32,
+    "mean_values": np.float32,
+}
+
+
+def pyramid_sizes(n_obs: int) -> list[int]:
+    """
+    Размеры корзин уровней пирамиды: 1 (сам ряд), PYRAMID_FACTOR, ... до
+    уровня из одной корзины.
+    """
+    sizes = [1]
+    while sizes[-1] < n_obs:
+        sizes.append(sizes[-1] * PYRAMID_FACTOR)
+    return sizes
+
+
+def build_level(y: np.ndarray, size: int) -> dict:
+    """
+    Уровень пирамиды с корзинами по size точек.
+    """
+    if size == 1:
+        return {"bucket_size": 1, "lttb_values": y.tobytes()}
+    mins, maxs, means, representatives = bucket_lttb(y, size)
+    return {
+        "bucket_size": size,
+        "lttb_index": representatives.tobytes(),
+        "lttb_values": y[representatives].tobytes(),
+        "min_values": mins.astype(np.float32).tobytes(),
+        "max_values": maxs.astype(np.float32).tobytes(),
+        "mean_values": means.astype(np.float32).tobytes(),
+    }
+
+
+def build_pyramid(data: list[float] | np.ndarray) -> list[dict]:
+    """
+    Многоуровневое представление ряда для просмотра: на каждом уровне
+    минимум, максимум и среднее по корзинам (float32) и LTTB-представители
+    корзин. Столбцы уровней хранятся байтами фиксированной ширины, поэтому
+    отрезок корзин читается из базы без чтения всего уровня.
+    Общий объем - около трети размера ряда во float64 поверх самого ряда.
+    """
+    y = np.asarray(data, dtype=np.float64)
+    return [build_level(y, size) for size in pyramid_sizes(len(y))]
+
+
+def extend_level(
+    columns: dict[str, bytes | None],
+    size: int,
+    n_obs: int,
+    data: list[float],
+    first_value: float,
+) -> tuple[int, dict[str, bytes]]:
+    """
+    Дописывание точек data к уровню ряда из n_obs точек за O(len(data)).
+    columns - корзины уровня начиная с first - 1, где first = n_obs // size -
+    незаполненная или первая новая корзина. Минимум, максимум и
+    среднее незаполненной корзины сливаются с новыми точками, ее
+    представитель выбирается из прежнего и новых точек, представители
+    заполненных корзин не пересматриваются.
+    Возвращает номер первой замененной корзины и столбцы уровня начиная с нее.
+    """
+    y = np.asarray(data, dtype=np.float64)
+    if size == 1:
+        return n_obs, {"lttb_values": y.tobytes()}
+
+    arrays = {
+        name: np.frombuffer(columns[name] or b"", dtype=dtype)
+        for name, dtype in LEVEL_COLUMNS.items()
+    }
+    n_total = n_obs + len(y)
+    first, filled = divmod(n_obs, size)
+    if first > 0:
+        prev_x, prev_y = arrays["lttb_index"][0], arrays["lttb_values"][0]
+    else:
+        # the first point anchors the first triangle, as in bucket_lttb
+        prev_x, prev_y = 0, first_value
+
+    starts = np.arange(size - filled if filled else 0, len(y), size)
+    if filled:
+        starts = np.concatenate([[0], starts])
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    counts = np.diff(np.append(starts, len(y)))
+    means = np.add.reduceat(y, starts) / counts
+    x = n_obs + np.arange(len(y), dtype=np.float64)
+    values = y
+    if filled:
+        mins[0] = min(mins[0], arrays["min_values"][-1])
+        maxs[0] = max(maxs[0], arrays["max_values"][-1])
+        means[0] = (arrays["mean_values"][-1] * filled + means[0] * counts[0]) / (
+            filled + counts[0]
+        )
+        # the previous representative competes with the new points
+        x = np.concatenate([[arrays["lttb_index"][-1]], x])
+        values = np.concatenate([[arrays["lttb_values"][-1]], y])
+        starts = np.concatenate([[0], starts[1:] + 1])
+
+    bucket_ends = np.minimum((first + np.arange(len(starts)) + 1) * size, n_total)
+    next_x = np.append((bucket_ends[:-1] + bucket_ends[1:] - 1) / 2, n_total - 1.0)
+    next_y = np.append(means[1:], y[-1])
+    chosen = lttb_select(
+        x, values, starts, next_x, next_y, float(prev_x), float(prev_y)
+    )
+    return first, {
+        "lttb_index": x[chosen].astype(np.int64).tobytes(),
+        "lttb_values": values[chosen].tobytes(),
+        "min_values": mins.astype(np.float32).tobytes(),
+        "max_values": maxs.astype(np.float32).tobytes(),
+        "mean_values": means.astype(np.float32).tobytes(),
+    }
+
+
+def view_window(
+    start: int, end: int, max_points: int, n_obs: int
+) -> tuple[int, int, int]:
+    """
+    Самый подробный уровень, на котором отрезок [start, end) покрывается не
+    более чем max_points корзинами. Возвращает размер корзины, номер первой
+    корзины и число корзин.
+    """
+    for size in pyramid_sizes(n_obs):
+        first = start // size
+        count = math.ceil(end / size) - first
+        if count <= max_points:
+            return size, first, count
+    return size, first, count
+
+
+def decode_view(columns: dict[str, bytes | None], bucket_size: int, first: int) -> dict:
+    """
+    Ответ просмотра ряда по отрезкам столбцов уровня: точки LTTB (на сыром
+    уровне - сами точки) и, для агрегированных уровней, полоса min/max и
+    среднее по корзинам, начинающимся с bucket_start.
+    """
+    arrays = {
+        name: np.frombuffer(columns[name] or b"", dtype=dtype)
+        for name, dtype in LEVEL_COLUMNS.items()
+    }
+    values = arrays["lttb_values"]
+    if bucket_size == 1:
+        return {
+            "bucket_size": 1,
+            "x": list(range(first, first + len(values))),
+            "y": values.tolist(),
+            "bucket_start": None,
+            "min": None,
+            "max": None,
+            "mean": None,
+        }
+
+    starts = (first + np.arange(len(values))) * bucket_size
+    return {
+        "bucket_size": bucket_size,
+        "x": arrays["lttb_index"].tolist(),
+        "y": values.tolist(),
+        "bucket_start": starts.tolist(),
+        "min": arrays["min_values"].astype(np.float64).tolist(),
+        "max": arrays["max_values"].astype(np.float64).tolist(),
+        "mean": arrays["mean_values"].astype(np.float64).tolist(),
+    }
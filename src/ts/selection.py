@@ -0,0 +1,148 @@
+import logging
+import time
+
+import numpy as np
+
+from ts.backtest import MIN_TRAIN_LENGTH, get_cutoffs, predict_windows
+from ts.forecast import ALL_MODELS, run_with_deadline
+
+AUTO_MODEL_NAME = "Auto"
+# the number of candidates is divided by this after every round of
+# successive halving, and the number of windows is multiplied by it
+HALVING_RATE = 2
+# share of a forecast time budget given to model selection, the rest is
+# left for fitting the selected model
+SELECTION_BUDGET_SHARE = 0.5
+# narrower searches of the slowest models, used only to rank them: a full
+# TBATS search takes seconds even on short series
+SELECTION_MODEL_PARAMS = {
+    "ARIMA": {"max_p": 2, "max_q": 2, "approximation": True, "nmodels": 10},
+    "TBATS": {"use_boxcox": False, "use_arma_errors": False},
+}
+
+
+def count_rounds(n_candidates: int) -> int:
+    n_rounds = 0
+    while n_candidates > 1:
+        n_candidates = max(n_candidates // HALVING_RATE, 1)
+        n_rounds += 1
+    return max(n_rounds, 1)
+
+
+def get_selection_windows(
+    n_obs: int, fh: int, n_candidates: int
+) -> tuple[int, list[int]]:
+    """
+    Горизонт и точки отсечения для отбора: в последнем раунде окон вдвое
+    больше, чем в предыдущем, начиная с одного окна в первом раунде.
+    Если ряд короткий, горизонт и число окон уменьшаются.
+    """
+    n_windows = HALVING_RATE ** (count_rounds(n_candidates) - 1)
+
+    h = max(min(fh, (n_obs - MIN_TRAIN_LENGTH) // n_windows), 1)
+    n_windows = min(n_windows, (n_obs - MIN_TRAIN_LENGTH - h) // h + 1)
+    if n_windows < 1:
+        raise ValueError("Series is too short for automatic model selection")
+    return h, get_cutoffs(n_obs, h, n_windows)
+
+
+def get_train_lengths(
+    n_obs: int, n_candidates: int, season_lengths: list[int] | None = None
+) -> list[int]:
+    """
+    Длины обучающих отрезков перед точками отсечения по раундам отбора:
+    последние точки ряда, с каждым раундом в HALVING_RATE раз больше, в
+    последнем раунде - 1 / HALVING_RATE истории. Отрезок не короче двух
+    сезонов.
+    """
+    n_rounds = count_rounds(n_candidates)
+    min_length = max(MIN_TRAIN_LENGTH, 2 * max(season_lengths or [1]))
+    return [
+        max(min_length, n_obs // HALVING_RATE ** (n_rounds - k))
+        for k in range(n_rounds)
+    ]
+
+
+def select_model(
+    series: list[float],
+    fh: int,
+    model_names: list[str] | None = None,
+    season_lengths: list[int] | None = None,
+    time_budget: float | None = None,
+) -> str:
+    """
+    Successive halving: все кандидаты проверяются на одном коротком окне,
+    худшая половина отбрасывается, оставшиеся проверяются на вдвое большем
+    числе окон, пока не останется одна модель. Модели сравниваются по
+    средней MAE по окнам. Первые раунды обучаются на коротких последних
+    отрезках истории (get_train_lengths), так что почти полные обучения
+    достаются только последним кандидатам, а самые медленные модели
+    сравниваются с суженным перебором (SELECTION_MODEL_PARAMS).
+    С бюджетом времени каждое обучение идет с дедлайном: не уложившиеся
+    модели (и все, до которых очередь дошла после исчерпания бюджета)
+    получают бесконечную ошибку, так что выбирается лучшая из проверенных.
+    """
+    deadline = time.monotonic() + time_budget if time_budget else None
+    candidates = list(model_names or ALL_MODELS)
+    series = np.asarray(series, dtype=np.float64)
+    h, cutoffs = get_selection_windows(len(series), fh, len(candidates))
+    train_lengths = get_train_lengths(len(series), len(candidates), season_lengths)
+
+    # MAE of every evaluated window, by model and (cutoff, train length)
+    window_maes = {model_name: {} for model_name in candidates}
+    n_windows, n_round = 1, 0
+    while len(candidates) > 1:
+        round_cutoffs = cutoffs[-n_windows:]
+        train_length = train_lengths[min(n_round, len(train_lengths) - 1)]
+        round_keys = [(c, train_length) for c in round_cutoffs]
+        for model_name in candidates:
+            new_cutoffs = [
+                c
+                for c, key in zip(round_cutoffs, round_keys)
+                if key not in window_maes[model_name]
+            ]
+            if not new_cutoffs:
+                continue
+            args = (
+                model_name,
+                series,
+                new_cutoffs,
+                h,
+                season_lengths,
+                train_length,
+                SELECTION_MODEL_PARAMS.get(model_name),
+            )
+            try:
+                if deadline is None:
+                    predictions = predict_windows(*args)
+                elif deadline > time.monotonic():
+                    predictions = run_with_deadline(
+                        predict_windows, args, deadline - time.monotonic()
+                    )
+                else:
+                    raise TimeoutError("selection time budget is spent")
+            except Exception as e:
+                logging.warning(f"{model_name} failed during model selection: {e}")
+                predictions = [np.full(h, np.inf)] * len(new_cutoffs)
+            for cutoff, predicted in zip(new_cutoffs, predictions):
+                mae = float(np.mean(np.abs(series[cutoff : cutoff + h] - predicted)))
+                # diverged forecasts rank last instead of breaking the sort
+                window_maes[model_name][cutoff, train_length] = (
+                    mae if np.isfinite(mae) else np.inf
+                )
+
+        scores = {
+            model_name: np.mean([window_maes[model_name][key] for key in round_keys])
+            for model_name in candidates
+        }
+        candidates = sorted(candidates, key=scores.get)[
+            : max(len(candidates) // HALVING_RATE, 1)
+        ]
+        logging.info(
+            f"Model selection round on {len(round_cutoffs)} windows of "
+            f"{train_length} points, scores: {scores}, kept: {candidates}"
+        )
+        n_windows = min(n_windows * HALVING_RATE, len(cutoffs))
+        n_round += 1
+
+    return candidates[0]
@@ -0,0 +1,112 @@
+import numpy as np
+from scipy.signal import welch
+
+from ts.kernels import detrend
+
+TOP_FREQUENCIES = 3
+SEASONAL_CANDIDATES = 5
+# Ряды длиннее этого анализируются периодограммой Уэлча по сегментам
+WELCH_MIN_LENGTH = 100_000
+WELCH_SEGMENT_LENGTH = 2**14
+# false alarm probability of a spectral peak over the background (Fisher's test)
+PEAK_SIGNIFICANCE = 0.01
+
+
+def welch_amplitudes(psd: np.ndarray, n_obs: int) -> np.ndarray:
+    """
+    Односторонняя спектральная плотность Уэлча в единицах модуля rfft ряда
+    длины n_obs: |X|^2 = n_obs * PSD / 2 при единичной частоте отсчетов.
+    """
+    return np.sqrt(psd * n_obs / 2)
+
+
+def get_spectra(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Спектры рядов одинаковой длины (строки 2D-массива) без линейного тренда
+    (иначе тренд просачивается в низкие частоты): модуль rfft для обычных рядов
+    и периодограмма Уэлча, пересчитанная в те же единицы, для длинных.
+    Возвращает положительные частоты (в циклах на отсчет) и амплитуды
+    (ряды x частоты).
+    """
+    if y.shape[1] > WELCH_MIN_LENGTH:
+        frequencies, psd = welch(
+            y, nperseg=WELCH_SEGMENT_LENGTH, detrend="linear", axis=-1
+        )
+        amplitudes = welch_amplitudes(psd, y.shape[1])
+    else:
+        _, _, detrended = detrend(y)
+        frequencies = np.fft.rfftfreq(y.shape[1])
+        amplitudes = np.abs(np.fft.rfft(detrended, axis=-1))
+    # the zero frequency is the mean level, not a cycle
+    return frequencies[1:], amplitudes[:, 1:]
+
+
+def get_spectrum(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    frequencies, amplitudes = get_spectra(y.reshape(1, -1))
+    return frequencies, amplitudes[0]
+
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    # partial selection instead of a full argsort, then order only the k winners
+    k = min(k, len(values))
+    if k == 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(values, -k)[-k:]
+    return top[np.argsort(values[top])[::-1]]
+
+
+def get_seasonal_periods(
+    frequencies: np.ndarray, amplitudes: np.ndarray, n_obs: int
+) -> list[int]:
+    """
+    Периоды сезонности в отсчетах по значимым локальным пикам спектра, от
+    самого сильного к самому слабому. Пик значим, если его мощность выше
+    порога критерия Фишера относительно степенного фона спектра (так красный
+    шум не дает ложных периодов). Частота пика уточняется параболической
+    интерполяцией, период должен уложиться в ряд хотя бы дважды.
+    """
+    power = amplitudes**2
+    if len(power) < 3:
+        return []
+    # power-law background (flat for white noise, 1/f^2 for random walks)
+    # fitted in log-log scale; the log of exponentially distributed power
+    # is biased by -euler_gamma
+    log_frequencies = np.log(frequencies)
+    slope, intercept = np.polyfit(log_frequencies, np.log(power + 1e-300), 1)
+    background = np.exp(intercept + slope * log_frequencies + np.euler_gamma)
+    threshold = background * np.log(len(power) / PEAK_SIGNIFICANCE)
+
+    is_peak = np.zeros(len(power), dtype=bool)
+    is_peak[1:-1] = (power[1:-1] > power[:-2]) & (power[1:-1] >= power[2:])
+    step = frequencies[1] - frequencies[0]
+
+    periods = []
+    for i in top_k_indices(np.where(is_peak, power, 0), SEASONAL_CANDIDATES):
+        if not is_peak[i] or power[i] < threshold[i]:
+            continue
+        a, b, c = np.log(power[i - 1 : i + 2])
+        offset = 0.5 * (a - c) / (a - 2 * b + c) if a - 2 * b + c < 0 else 0.0
+        period = int(round(1 / (frequencies[i] + offset * step)))
+        if 2 <= period <= n_obs // 2 and period not in periods:
+            periods.append(period)
+    return periods
+
+
+def get_spectral_analysis_many(y: np.ndarray) -> list[dict]:
+    """
+    Частотный анализ рядов одинаковой длины (строки 2D-массива).
+    """
+    frequencies, amplitudes = get_spectra(np.asarray(y, dtype=np.float64))
+    results = []
+    for row in amplitudes:
+        top = top_k_indices(row, TOP_FREQUENCIES)
+        results.append(
+            {
+                "fourier_freqs": {
+                    "frequencies": frequencies[top].tolist(),
+                    "amplitudes": row[top].tolist(),
+                },
+                "seasonal_periods": get_seasonal_periods(frequencies, row, y.shape[1]),
+            }
+        )
+    return results
@@ -0,0 +1,58 @@
+"""
+Прогретый воркер Redis Queue: до первой задачи импортирует библиотеки и
+прогоняет анализ и все модели из ALL_MODELS на маленьком ряде.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# settings read at import time by the task modules come from the dotenv file,
+# and NUMBA_CACHE_DIR must be set before numba is imported for the first time
+load_dotenv()
+os.environ.setdefault("NUMBA_CACHE_DIR", str(Path(".numba_cache").resolve()))
+
+import numpy as np
+from redis import Redis
+from rq import Worker
+
+import tasks  # noqa: F401 (preloads everything the jobs import)
+from ts.analyze import analyze_time_series
+from ts.forecast import ALL_MODELS, LinearTrendModel, forecast, train_model
+
+WARMUP_LENGTH = 100
+WARMUP_SEASON_LENGTH = 7
+
+
+def warm_up():
+    rng = np.random.default_rng(0)
+    index = np.arange(WARMUP_LENGTH)
+    series = (
+        10
+        + 0.1 * index
+        + np.sin(2 * np.pi * index / WARMUP_SEASON_LENGTH)
+        + rng.normal(0, 0.1, WARMUP_LENGTH)
+    ).tolist()
+
+    start = time.perf_counter()
+    analyze_time_series(series)
+    for model_name in ALL_MODELS:
+        forecast(train_model(model_name, series, [WARMUP_SEASON_LENGTH]), 3)
+    LinearTrendModel.forecast_batch(np.array([series, series]), 3)
+    logging.info(f"Worker warmed up in {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    warm_up()
+
+    redis_conn = Redis(host=os.getenv("REDIS_HOST"), port=int(os.getenv("REDIS_PORT")))
+    # the default Worker forks a work-horse per job from this warm process
+    Worker(["default"], connection=redis_conn).work()
+
+
+if __name__ == "__main__":
+    main()